@@ -19,6 +19,8 @@ import matplotlib.ticker as ticker
 import matplotlib.dates as mdates
 from finance import *
 from stockUtils import *
+from stockData import *
+from stockReturns import *
 
 M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
 
@@ -26,6 +28,9 @@ close_prices = M['Close']
 open_prices = M['Open']
 dates = M['Date']
 
+# All representations of the returns of the closing prices, padded to line up with the dates
+R = Returns(close_prices, pad=True)
+
 # 1 : Stock Prices
 
 series1 = close_prices;
@@ -36,26 +41,26 @@ series2 = close_prices;
 
 # 3 : Compound Returns
 
-series3 = compound_return(close_prices)
+series3 = R.compound
 
 # 4 : Compound Retuns (Log Scale)
 
-series4 = compound_return(close_prices)
+series4 = R.compound
 
 # 5 : Percent returns 
 
-series5 = percent_return(close_prices)
+series5 = R.percent
 
 # 6 : Percent Log Returns
 
-series6 = log_return(close_prices) * 100;
+series6 = R.cumulative * 100;
 
 # 7 : Daily Percent Returns
 
-series7 = net_return(close_prices, False) * 100;
+series7 = R.net * 100;
 
 # 8 : Daily Log Returns
-series8 = log(gross_return(close_prices)) * 100;
+series8 = R.log * 100;
 
 # Plot
 fig, ax = plt.subplots(4,2)
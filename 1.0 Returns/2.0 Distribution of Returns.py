@@ -21,113 +21,128 @@
 import matplotlib.pyplot as plt
 from finance import *
 from stockUtils import *
+from stockData import *
 import stable as stable
+from returnSketch import *
+from stableTable import *
+from stableFit import *
 
-M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
+if __name__ == '__main__':
 
-close_prices = M['Close']
-open_prices = M['Open']
-dates = M['Date']
+    table = StableTable()
 
-log_returns = log(gross_return(close_prices));
+    M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
 
-x_standard = linspace(-40,40,2001);
-x_standard_diff = (x_standard[1] - x_standard[0]);
+    close_prices = M['Close']
+    open_prices = M['Open']
+    dates = M['Date']
 
-# Actual PDF
-n, bars = histogram(log_returns, 100, normed=True);
-bars = bars[0:len(bars)-1]
-barWidth = bars[1] - bars[0]
+    log_returns = log(gross_return(close_prices));
 
-# Actual CDF
-actual_x = sort(log_returns)
-actual_cdf = zeros(len(log_returns))
-actual_cdf[:] = (1.0/len(log_returns))
-actual_cdf = cumsum(actual_cdf)
+    x_standard = linspace(-40,40,2001);
+    x_standard_diff = (x_standard[1] - x_standard[0]);
 
-# 1 : Fit to Normal Distribution
+    # Streaming summary of the returns : fixed memory, can be updated chunk by chunk (e.g. tick data) and
+    # merged across files / symbols
+    summary = ReturnDistribution(-0.25, 0.25, 250)
+    summary.update(log_returns)
 
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=2.0, beta=0.0); 
+    # Actual PDF
+    n, bars = summary.histogram.density();
+    bars = bars[0:len(bars)-1]
+    barWidth = bars[1] - bars[0]
 
-# Transform the x-scale to standardised form (i.e. gamma = 1) to get the relevant pdf values.
-# Plot scaled pdf values at original x values to scale out the pdf.
+    # Actual CDF (exact in the tails, quantile sketch in the body)
+    actual_x, actual_cdf = summary.quantiles.ecdf()
 
-normal_x = (x_standard * gamma) + delta;
-x_diff = normal_x[1] - normal_x[0];
+    # Fit the four models in parallel
+    
+    fits = fitAll({'^GSPC': log_returns})
+    params = dict((f.model, (f.alpha, f.beta, f.gamma, f.delta)) for f in fits)
+    
+    # 1 : Fit to Normal Distribution
 
-pdf = stable.pdf(x_standard, alpha, beta);
-normal_pdf = pdf * x_standard_diff / x_diff
+    alpha,beta,gamma,delta = params['Normal']
 
-normal_cdf = stable.cdf(x_standard, alpha, beta);
+    # Transform the x-scale to standardised form (i.e. gamma = 1) to get the relevant pdf values.
+    # Plot scaled pdf values at original x values to scale out the pdf.
 
-# 2 : Fit to Cauchy Distribution
+    normal_x = (x_standard * gamma) + delta;
+    x_diff = normal_x[1] - normal_x[0];
 
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=1.0, beta=0.0); 
+    pdf = table.pdf(x_standard, alpha, beta);
+    normal_pdf = pdf * x_standard_diff / x_diff
 
-cauchy_x = (x_standard * gamma) + delta;
-x_diff = cauchy_x[1] - cauchy_x[0];
+    normal_cdf = table.cdf(x_standard, alpha, beta);
 
-pdf = stable.pdf(x_standard, alpha, beta);
-cauchy_pdf = pdf * x_standard_diff / x_diff
+    # 2 : Fit to Cauchy Distribution
 
-cauchy_cdf = stable.cdf(x_standard, alpha, beta);
+    alpha,beta,gamma,delta = params['Cauchy']
 
-# 3 : Fit to Levy Distribution
+    cauchy_x = (x_standard * gamma) + delta;
+    x_diff = cauchy_x[1] - cauchy_x[0];
 
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=0.5, beta=0.0); 
+    pdf = table.pdf(x_standard, alpha, beta);
+    cauchy_pdf = pdf * x_standard_diff / x_diff
 
-levy_x = (x_standard * gamma) + delta;
-x_diff = levy_x[1] - levy_x[0];
+    cauchy_cdf = table.cdf(x_standard, alpha, beta);
 
-pdf = stable.pdf(x_standard, alpha, beta);
-levy_pdf = pdf * x_standard_diff / x_diff
+    # 3 : Fit to Levy Distribution
 
-levy_cdf = stable.cdf(x_standard, alpha, beta);
+    alpha,beta,gamma,delta = params['Levy']
 
-# 4 : Fit to Stable Distribution
+    levy_x = (x_standard * gamma) + delta;
+    x_diff = levy_x[1] - levy_x[0];
 
-alpha,beta,gamma,delta = stable.fit(log_returns); 
+    pdf = table.pdf(x_standard, alpha, beta);
+    levy_pdf = pdf * x_standard_diff / x_diff
 
-stable_x = (x_standard * gamma) + delta;
-x_diff = stable_x[1] - stable_x[0];
+    levy_cdf = table.cdf(x_standard, alpha, beta);
 
-pdf = stable.pdf(x_standard, alpha, beta);
-stable_pdf = pdf * x_standard_diff / x_diff
+    # 4 : Fit to Stable Distribution
 
-stable_cdf = stable.cdf(x_standard, alpha, beta);
+    alpha,beta,gamma,delta = params['Stable']
 
+    stable_x = (x_standard * gamma) + delta;
+    x_diff = stable_x[1] - stable_x[0];
 
-# Plot
-fig, ax = plt.subplots(2)
+    pdf = table.pdf(x_standard, alpha, beta);
+    stable_pdf = pdf * x_standard_diff / x_diff
 
-chart = ax[0]
-chart.set_title('Probability Density of Returns');
-chart.bar(bars, n, width=barWidth);
-chart.plot(normal_x, normal_pdf , 'g', label='Normal');
-chart.plot(cauchy_x, cauchy_pdf , 'cyan', label='Cauchy');
-chart.plot(levy_x, levy_pdf , 'y', label='Levy');
-chart.plot(stable_x, stable_pdf , 'r', label='Stable');
-chart.set_xlim([-0.1, 0.1])
-chart.set_ylim([0, 80])
-handles, labels = chart.get_legend_handles_labels()
-chart.legend(handles, labels)
-chart.grid();
+    stable_cdf = table.cdf(x_standard, alpha, beta);
 
-# Plot : CDF
-chart = ax[1]
-chart.set_title('Cumulative Distribution of Returns');
-chart.scatter(actual_x, actual_cdf)
-chart.plot(normal_x, normal_cdf , 'g', label='Normal');
-chart.plot(cauchy_x, cauchy_cdf , 'cyan', label='Cauchy');
-chart.plot(levy_x, levy_cdf , 'y', label='Levy');
-chart.plot(stable_x, stable_cdf , 'r', label='Stable');
-chart.set_xlim([-0.1, 0.1])
-chart.set_ylim([0, 1])
-handles, labels = chart.get_legend_handles_labels()
-chart.legend(handles, labels)
-chart.grid();
 
-mng = plt.get_current_fig_manager()
-mng.resize(1280,960)
+    # Plot
+    fig, ax = plt.subplots(2)
 
-plt.show()
\ No newline at end of file
+    chart = ax[0]
+    chart.set_title('Probability Density of Returns');
+    chart.bar(bars, n, width=barWidth);
+    chart.plot(normal_x, normal_pdf , 'g', label='Normal');
+    chart.plot(cauchy_x, cauchy_pdf , 'cyan', label='Cauchy');
+    chart.plot(levy_x, levy_pdf , 'y', label='Levy');
+    chart.plot(stable_x, stable_pdf , 'r', label='Stable');
+    chart.set_xlim([-0.1, 0.1])
+    chart.set_ylim([0, 80])
+    handles, labels = chart.get_legend_handles_labels()
+    chart.legend(handles, labels)
+    chart.grid();
+
+    # Plot : CDF
+    chart = ax[1]
+    chart.set_title('Cumulative Distribution of Returns');
+    chart.scatter(actual_x, actual_cdf)
+    chart.plot(normal_x, normal_cdf , 'g', label='Normal');
+    chart.plot(cauchy_x, cauchy_cdf , 'cyan', label='Cauchy');
+    chart.plot(levy_x, levy_cdf , 'y', label='Levy');
+    chart.plot(stable_x, stable_cdf , 'r', label='Stable');
+    chart.set_xlim([-0.1, 0.1])
+    chart.set_ylim([0, 1])
+    handles, labels = chart.get_legend_handles_labels()
+    chart.legend(handles, labels)
+    chart.grid();
+
+    mng = plt.get_current_fig_manager()
+    mng.resize(1280,960)
+
+    plt.show()
\ No newline at end of file
@@ -24,150 +24,159 @@
 import matplotlib.pyplot as plt
 from finance import *
 from stockUtils import *
+from stockData import *
 import stable as stable
 import matplotlib.ticker as ticker
+from returnSketch import *
+from stableFit import *
+from tails import *
 
-def getLeftTail(x, delta):
-    j=0;
-    for i in x:
-        if i > delta:
-            break;
-        j=j+1;
-    return j;
-    
-def getRightTail(x, delta):
-    j=0;
-    for i in x:
-        if i >= delta:
-            break;
-        j=j+1;
-    return j;
-
-M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/1995", "01/05/2010");
-
-close_prices = M['Close']
-open_prices = M['Open']
-dates = M['Date']
-
-log_returns = log(gross_return(close_prices));
-n, bars = histogram(log_returns, 100, normed=True);
-bars = bars[0:-1]
-barWidth = bars[1] - bars[0]
-
-cdf_steps = 8001
-midpoint = int(cdf_steps / 2.0);
-cdf_stepSize = 200.0 / midpoint
-
-stable.init(log_returns);
-fig, ax = plt.subplots(2)
-
-# 1 : Fit to Normal Distribution
-
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=2.0, beta=0.0); 
-
-normal_cdf_x, normal_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
-normal_x = normal_cdf_x[midpoint+1:]
-
-# 2 : Cauchy Distribution
-
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=1.0, beta=0.0); 
-
-cauchy_cdf_x, cauchy_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
-cauchy_x = cauchy_cdf_x[midpoint+1:]
-
-# 3 : Levy Distribution
-
-alpha,beta,gamma,delta = stable.fit(log_returns, alpha=0.5, beta=0.0); 
-
-levy_cdf_x, levy_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
-levy_x = levy_cdf_x[midpoint+1:]
-
-# 4 : Stable Distribution
-
-alpha,beta,gamma,delta = stable.fit(log_returns); 
-
-stable_cdf_x, stable_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
-stable_x = stable_cdf_x[midpoint+1:]
-stable_delta = delta
-
-# Actual CDF
-actual_x = sort(log_returns)
-actual_cdf = zeros(len(log_returns))
-actual_cdf[:] = (1.0/(len(log_returns)+1))
-actual_cdf = cumsum(actual_cdf)
-
-leftStart = getLeftTail(actual_x, stable_delta)
-rightStart = getRightTail(actual_x, stable_delta)
-
-left_x = abs(actual_x[0:leftStart] - stable_delta) + stable_delta
-left_cdf = actual_cdf[0:leftStart]
-
-right_x = abs(actual_x[rightStart:] - stable_delta) + stable_delta
-right_cdf = actual_cdf[rightStart:]
-
-# Plot : CDF
-chart = ax[0]
-chart.set_title('Distribution of Returns');
-chart.set_yscale('log', basey=e)
-chart.set_xscale('log', basey=e)
-chart.set_yticks([1e-05,0.0001,0.001,0.01,1])
-chart.set_ylim(1e-05,1)
-chart.plot(normal_x, normal_cdf_y[0:midpoint][::-1] , 'g', label='Normal');
-chart.plot(normal_x, 1 - normal_cdf_y[midpoint+1:] , 'g');
-chart.plot(cauchy_x, cauchy_cdf_y[0:midpoint][::-1] , 'cyan', label='Cauchy');
-chart.plot(cauchy_x, 1 - cauchy_cdf_y[midpoint+1:] , 'cyan');
-chart.plot(levy_x, levy_cdf_y[0:midpoint][::-1] , 'y', label='Levy');
-chart.plot(levy_x, 1 - levy_cdf_y[midpoint+1:] , 'y');
-chart.plot(stable_x, stable_cdf_y[0:midpoint][::-1] , 'b', label='Stable (Left)');
-chart.plot(stable_x, 1 - stable_cdf_y[midpoint+1:] , 'r', label='Stable (Right)');
-chart.scatter(left_x, left_cdf, color='blue')
-chart.scatter(right_x, 1 - right_cdf, color='red')
-chart.yaxis.set_major_formatter(ticker.ScalarFormatter())
-handles, labels = chart.get_legend_handles_labels()
-chart.legend(handles, labels)
-chart.grid();
-
-# Calculate the alpha of the stable distribution from the tail
-
-stable_left = log(stable_cdf_y[:midpoint][::-1][-50:])
-stable_right = log((1 - stable_cdf_y[midpoint:])[-50:])
-stable_tail_x = log(stable_cdf_x[midpoint+1:][-50:])
+if __name__ == '__main__':
 
-left_stable_slope, left_stable_intercept = linalg.lstsq(array([stable_tail_x,ones(len(stable_tail_x))]).T,stable_left)[0]
-right_stable_slope, right_stable_intercept = linalg.lstsq(array([stable_tail_x,ones(len(stable_tail_x))]).T,stable_right)[0]
+    M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/1995", "01/05/2010");
 
-# Extract least likely 5% data, fit a regression line to the log values
-# in order to calculate the slope, i.e. the exponent
-#
-# QUESTION : The slope will change depending on gamma & delta, but alpha is supposed to stay constant!.
-# ANSWER : Increase sample points (i.e. measure further out in the tail), will eventually converge to alpha.
+    close_prices = M['Close']
+    open_prices = M['Open']
+    dates = M['Date']
+
+    log_returns = log(gross_return(close_prices));
+
+    # Streaming summary of the returns : the tail buffers keep the 2000 most extreme returns on each side exactly
+    summary = ReturnDistribution(-0.25, 0.25, 250, tail=2000)
+    summary.update(log_returns)
+
+    n, bars = summary.histogram.density();
+    bars = bars[0:-1]
+    barWidth = bars[1] - bars[0]
+
+    cdf_steps = 8001
+    midpoint = int(cdf_steps / 2.0);
+    cdf_stepSize = 200.0 / midpoint
+
+    stable.init(log_returns);
+    fig, ax = plt.subplots(2)
+
+    # Fit the four models in parallel, each worker initialised on the returns as this process is for cdf2
+
+    fits = fitAll({'^GSPC': log_returns}, init=True)
+    params = dict((f.model, (f.alpha, f.beta, f.gamma, f.delta)) for f in fits)
+
+    # 1 : Fit to Normal Distribution
+
+    alpha,beta,gamma,delta = params['Normal']
+
+    normal_cdf_x, normal_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
+    normal_x = normal_cdf_x[midpoint+1:]
+
+    # 2 : Cauchy Distribution
+
+    alpha,beta,gamma,delta = params['Cauchy']
+
+    cauchy_cdf_x, cauchy_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
+    cauchy_x = cauchy_cdf_x[midpoint+1:]
+
+    # 3 : Levy Distribution
+
+    alpha,beta,gamma,delta = params['Levy']
+
+    levy_cdf_x, levy_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
+    levy_x = levy_cdf_x[midpoint+1:]
+
+    # 4 : Stable Distribution
+
+    alpha,beta,gamma,delta = params['Stable']
+
+    stable_cdf_x, stable_cdf_y = stable.cdf2(alpha, beta, gamma, delta, cdf_steps, cdf_stepSize * gamma);
+    stable_x = stable_cdf_x[midpoint+1:]
+    stable_delta = delta
+
+    # Actual CDF (exact in the tails, quantile sketch in the body)
+    actual_x, actual_cdf = summary.quantiles.ecdf()
+
+    leftStart = getLeftTail(actual_x, stable_delta)
+    rightStart = getRightTail(actual_x, stable_delta)
+
+    left_x = abs(actual_x[0:leftStart] - stable_delta) + stable_delta
+    left_cdf = actual_cdf[0:leftStart]
+
+    right_x = abs(actual_x[rightStart:] - stable_delta) + stable_delta
+    right_cdf = actual_cdf[rightStart:]
+
+    # Plot : CDF
+    chart = ax[0]
+    chart.set_title('Distribution of Returns');
+    chart.set_yscale('log', basey=e)
+    chart.set_xscale('log', basey=e)
+    chart.set_yticks([1e-05,0.0001,0.001,0.01,1])
+    chart.set_ylim(1e-05,1)
+    chart.plot(normal_x, normal_cdf_y[0:midpoint][::-1] , 'g', label='Normal');
+    chart.plot(normal_x, 1 - normal_cdf_y[midpoint+1:] , 'g');
+    chart.plot(cauchy_x, cauchy_cdf_y[0:midpoint][::-1] , 'cyan', label='Cauchy');
+    chart.plot(cauchy_x, 1 - cauchy_cdf_y[midpoint+1:] , 'cyan');
+    chart.plot(levy_x, levy_cdf_y[0:midpoint][::-1] , 'y', label='Levy');
+    chart.plot(levy_x, 1 - levy_cdf_y[midpoint+1:] , 'y');
+    chart.plot(stable_x, stable_cdf_y[0:midpoint][::-1] , 'b', label='Stable (Left)');
+    chart.plot(stable_x, 1 - stable_cdf_y[midpoint+1:] , 'r', label='Stable (Right)');
+    chart.scatter(left_x, left_cdf, color='blue')
+    chart.scatter(right_x, 1 - right_cdf, color='red')
+    chart.yaxis.set_major_formatter(ticker.ScalarFormatter())
+    handles, labels = chart.get_legend_handles_labels()
+    chart.legend(handles, labels)
+    chart.grid();
+
+    # Calculate the alpha of the stable distribution from the tail
+
+    stable_left = log(stable_cdf_y[:midpoint][::-1][-50:])
+    stable_right = log((1 - stable_cdf_y[midpoint:])[-50:])
+    stable_tail_x = log(stable_cdf_x[midpoint+1:][-50:])
+
+
+    # Extract least likely 5% data, fit a regression line to the log values
+    # in order to calculate the slope, i.e. the exponent
+    #
+    # QUESTION : The slope will change depending on gamma & delta, but alpha is supposed to stay constant!.
+    # ANSWER : Increase sample points (i.e. measure further out in the tail), will eventually converge to alpha.
+
+    left = log(left_cdf[:50])
+    left_x = log(left_x[:50])
+
+    right = log((1-right_cdf)[-50:])
+    right_x = log(right_x[-50:])
+
+    # All four tail regressions (stable left/right, actual left/right) in one batch
+    slopes, intercepts, errors = tailRegression( \
+        array([stable_tail_x, stable_tail_x, left_x, right_x]), \
+        array([stable_left, stable_right, left, right]))
+
+    left_stable_slope, right_stable_slope, left_slope, right_slope = slopes
+    left_stable_intercept, right_stable_intercept, left_intercept, right_intercept = intercepts
 
-left = log(left_cdf[:50])
-left_x = log(left_x[:50])
+    left_line = left_slope*left_x+left_intercept
+    right_line = right_slope*right_x+right_intercept
 
-right = log((1-right_cdf)[-50:])
-right_x = log(right_x[-50:])
+    formula_left = "alpha = %.2f +/- %.2f" % (left_slope, errors[2])
+    formula_right = "alpha = %.2f +/- %.2f" % (right_slope, errors[3])
 
-left_slope, left_intercept = linalg.lstsq(array([left_x,ones(len(left_x))]).T,left)[0]
-right_slope, right_intercept = linalg.lstsq(array([right_x,ones(len(right_x))]).T,right)[0]
+    # Tail exponents over a range of tail sizes, measured from the fitted stable delta
 
-left_line = left_slope*left_x+left_intercept
-right_line = right_slope*right_x+right_intercept
+    fractions = [0.01, 0.025, 0.05, 0.1]
+    hill_left, hill_left_se, hill_right, hill_right_se = sketchTailIndex(summary.quantiles, stable_delta, fractions)
 
-formula_left = "alpha = %.2f" % left_slope
-formula_right = "alpha = %.2f" % right_slope
+    print ("Tail Fraction    Left alpha (Hill)    Right alpha (Hill)")
+    for i in range(0, len(fractions)):
+        print ("%12.3f     %5.2f +/- %.2f       %5.2f +/- %.2f" % (fractions[i], hill_left[i], hill_left_se[i], hill_right[i], hill_right_se[i]))
 
-chart = ax[1]
-chart.set_title('Tail Exponent');
-chart.scatter(left_x, left, color='blue', label='Left Tail')
-chart.scatter(right_x, right, color='red', label='Right Tail')
-chart.plot([left_x[0], left_x[-1]],[left_line[0], left_line[-1]],'b-',label=formula_left)
-chart.plot([right_x[0], right_x[-1]],[right_line[0], right_line[-1]],'r-',label=formula_right)
-handles, labels = chart.get_legend_handles_labels()
-chart.legend(handles, labels)
-chart.grid();
+    chart = ax[1]
+    chart.set_title('Tail Exponent');
+    chart.scatter(left_x, left, color='blue', label='Left Tail')
+    chart.scatter(right_x, right, color='red', label='Right Tail')
+    chart.plot([left_x[0], left_x[-1]],[left_line[0], left_line[-1]],'b-',label=formula_left)
+    chart.plot([right_x[0], right_x[-1]],[right_line[0], right_line[-1]],'r-',label=formula_right)
+    handles, labels = chart.get_legend_handles_labels()
+    chart.legend(handles, labels)
+    chart.grid();
 
-mng = plt.get_current_fig_manager()
-mng.resize(1280,960)
+    mng = plt.get_current_fig_manager()
+    mng.resize(1280,960)
 
-plt.show()
+    plt.show()
@@ -72,62 +72,10 @@ import matplotlib.ticker as ticker
 import sys as sys
 from finance import *
 from stockUtils import *
-from trading import maxDD
-from uuid import uuid4
-    
-# ======================          
-# Strategy Class
-# ======================
-
-class Strategy:
-    def __init__(self, net_return, name=uuid4().hex, period=252.0, kelly=0, r=0):
-        
-        ''' Unleveraged Returns & Statistics '''
-        self.name = name
-        self.net_return = net_return   
-        self.r = r    
-        self.mean = mean(self.net_return) 
-        self.var = var(self.net_return)
-        self.std = std(self.net_return)
-        self.amean = self.mean * period
-        self.kelly = (self.mean - (self.r / period)) / self.var
-        self.sharpe = sqrt(period) * (self.mean - (self.r / period)) / self.std
-        
-        ''' Leveraged Returns & Statistics '''
-        self.leverage = 1
-        if kelly>0:
-            self.leverage = kelly * self.kelly
-        
-        compound_return = cumprod(1 + (self.leverage * net_return + (1.0 - self.leverage) * ((1 + self.r) ** (1.0/period) - 1)))
-        self.compound_return = np.insert(compound_return,0,1)
-        
-        # Difference between gmean and APR due to daily compounded returns (APR) rather than continuously compounded returns (gmean)
-        self.gmean = exp(r + self.leverage * ((self.mean * period) - r) - ((self.var * period * (self.leverage ** 2)) / 2.0))-1
-        self.APR = self.compound_return[-1] ** (1.0 * period/float(len(self.compound_return))) - 1 # Nth root of the final capital
-        self.APR = exp(log(self.compound_return[-1]) / (len(self.compound_return) / period)) - 1 # exp(log of final capital / T)
-        
-        self.maxDD, self.maxDDD = maxDD(self.compound_return)
-        self.romad = self.APR / self.maxDD
-    
-    def display(self):
-        
-        # Strategy Statistics
-        print
-        print "=" * (len(self.name) + 14)
-        print "Strategy ID : %s " % self.name
-        print "Aritmetic Mean = %.2f" % (self.amean * 100)
-        print "Sharpe Ratio = %.2f" % self.sharpe
-        print "Kelly Optimal Leverage = %.2f" % self.kelly
-        
-        # Execution Statistics
-        print "Geometric Mean Annual Return (APR) = %.2f%%" % (self.gmean * 100)
-        print "Max Drawdown = %.2f%%" % (self.maxDD * 100)
-        print "Max Drawdown Duration = %d days" % self.maxDDD
-        print "Return over Maximum Drawdown (RoMaD) = %.2f" % self.romad
-        print "Strategy Leverage = %.2f" % self.leverage
-        print "APR = %.2f" % (self.APR * 100)
-        print "=" * (len(self.name) + 14)
-            
+from stockData import *
+from plotUtils import *
+from drawdown import *
+from strategyStats import *
 
 # ======================
 # Instance of a Strategy
@@ -135,21 +83,25 @@ class Strategy:
 
 M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "02/01/1993", "12/28/2007");
 
-# Strategy 1 - Trading the S&P500
-strategy_list = [ \
-    Strategy(net_return(M['Close']), name='S&P500 Unlevered', r=0.04), \
-    Strategy(net_return(M['Close']), name='S&P500 Full-Kelly', kelly=1, r=0.04), \
-    Strategy(net_return(M['Close']), name='S&P500 3/4-Kelly', kelly=0.75, r=0.04), \
-    Strategy(net_return(M['Close']), name='S&P500 1/2-Kelly', kelly=0.5, r=0.04), \
-    Strategy(net_return(M['Close']), name='S&P500 1/4-Kelly', kelly=0.25) \
-    ]
+# Strategy 1 - Trading the S&P500, the same return at five leverage settings
+grid = StrategyGrid(net_return(M['Close']), \
+    names=['S&P500 Unlevered', 'S&P500 Full-Kelly', 'S&P500 3/4-Kelly', 'S&P500 1/2-Kelly', 'S&P500 1/4-Kelly'], \
+    kelly=[0, 1, 0.75, 0.5, 0.25], \
+    r=[0.04, 0.04, 0.04, 0.04, 0])
 
 # ==================
 # Display Statistics
 # ==================
 
-for strategy in strategy_list:
-    strategy.display()
+grid.display()
+
+# Incremental statistics : the unlevered strategy again, fed one year of bars at a time as if arriving live
+live = StreamingStrategy(name='S&P500 Unlevered (Streamed)', r=0.04)
+returns = net_return(M['Close'])
+for i in range(0, len(returns), 252):
+    live.update(returns[i:i+252])
+
+live.display()
 
 # ====
 # Plot
@@ -159,11 +111,8 @@ fig, ax = plt.subplots(1)
 
 # Set up plot
 fig.autofmt_xdate()
-minc = sys.maxsize
-maxc = 0
-for strategy in strategy_list:
-    minc = min(minc, min(strategy.compound_return))
-    maxc = max(maxc, max(strategy.compound_return))
+minc = grid.compound_return.min()
+maxc = grid.compound_return.max()
 ax.set_title('Strategy Architecture');
 ax.set_yscale('log', basey=e)
 ax.set_yticks([.1,.2,.3,.4,.5,.6,.7,.8,.9,1,2,3,4,5,6,7,8,9,10,20,30,40,50,100,200,300,400,500])
@@ -174,8 +123,8 @@ ax.grid();
 # Plot returns on log scale
 colors = ['g','b','r','c','m','y'] # Allows for 6 plots
 
-for i in range(0, len(strategy_list)):
-    ax.plot(M['Date'], strategy_list[i].compound_return, colors[i], label=strategy_list[i].name)
+for i in range(0, len(grid.names)):
+    plotDecimated(ax, M['Date'], grid.compound_return[i], colors[i], label=grid.names[i])
 
 handles, labels = ax.get_legend_handles_labels()
 ax.legend(handles, labels, loc=2)
@@ -184,7 +133,7 @@ ax.legend(handles, labels, loc=2)
 ax1 = fig.add_axes([0,0,1,1])
 ax1.set_axis_off()
 
-for i in range(0,len(strategy_list)):
+for i in range(0,len(grid.names)):
     
     textstr = \
     '%s\n' \
@@ -193,15 +142,15 @@ for i in range(0,len(strategy_list)):
     '$\mathtt{MaxDD}=%.2f$%%\n' \
     '$\mathtt{MaxDDD=%d\/days}$\n' \
     '$\mathtt{Leverage}=%.2f$' % ( \
-        strategy_list[i].name, \
-        (strategy_list[i].APR * 100), \
-        strategy_list[i].sharpe, \
-        (strategy_list[i].maxDD * 100), \
-        strategy_list[i].maxDDD,
-        strategy_list[i].leverage
+        grid.names[i], \
+        (grid.APR[i] * 100), \
+        grid.sharpe[i], \
+        (grid.maxDD[i] * 100), \
+        grid.maxDDD[i],
+        grid.leverage[i]
         )
     
-    ax1.text(1.0*(i+1)/(len(strategy_list)+1), -.1, 
+    ax1.text(1.0*(i+1)/(len(grid.names)+1), -.1, 
             textstr, 
             horizontalalignment='center',
             verticalalignment='top',
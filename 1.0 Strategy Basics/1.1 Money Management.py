@@ -52,6 +52,10 @@ import matplotlib.dates as mdates
 import matplotlib.ticker as ticker
 from finance import *
 from stockUtils import *
+from stockData import *
+from spreadBetting import *
+from kelly import *
+import stable as stable
 
 result = loadStocks([ \
     STOCK_ROOT+'/2012/^DJI.csv', \
@@ -96,6 +100,27 @@ compound_return1b = cumprod(np.insert((1 + strategy1b),0,1))
 compound_return1c = cumprod(np.insert((1 + strategy1c),0,1))
 compound_return1d = cumprod(np.insert((1 + strategy1d),0,1))
 
+# Walk forward : kelly fitted on the previous 3 years and traded for the following quarter (r = 0%)
+
+wf = walkForward(X1, train=3 * period, test=period // 4, r=0.0)
+compound_return1e = wf['compound_return']
+print ("Walk forward kelly : leverage %.2f to %.2f, final value %.2f" % (wf['folds'].leverage.min(), \
+    wf['folds'].leverage.max(), compound_return1e[-1]))
+
+# Distribution of the outcome of fractions of kelly over resampled histories (r = 0%)
+
+fractions = f1a * array([0.25, 0.5, 0.75, 1.0, 1.5, 2.0])
+simulations = [ \
+    ('Stationary bootstrap', simulateKelly(X1, fractions, paths=2000, method='stationary', seed=1)), \
+    ('Stable', simulateKelly(X1, fractions, paths=2000, method='stable', params=stable.fit(X1), seed=1)), \
+    ]
+
+for name, mc in simulations:
+    print ("%s : f, median wealth, 5%% wealth, median maxDD, 95%% maxDD, P(ruin)" % name)
+    for i in range(len(fractions)):
+        print ("  %.2f %10.2f %10.2f %6.2f %6.2f %6.3f" % (fractions[i], median(mc['wealth'][:, i]), \
+            percentile(mc['wealth'][:, i], 5), median(mc['maxDD'][:, i]), percentile(mc['maxDD'][:, i], 95), mc['ruin'][i]))
+
 # Strategy 2 - Trading with Spreadbetting (X = Pn - Pn-1)
 
 X2 = diff(close_prices)
@@ -117,6 +142,10 @@ compound_return2a = cumprod(np.insert((1 + strategy2a),0,1)) # W(1+fr)
 compound_return2b = cumprod(np.insert((1 + strategy2b),0,1))
 compound_return2c = cumprod(np.insert((1 + strategy2c),0,1))
 
+# Spreads as they would be traded : m and s estimated from the trailing year only, 500 pips margin per unit stake
+sizing = spreadStakes(close_prices, window=period, r=0.04, margin=500.0)
+compound_return2d = sizing['compound_return']
+
 # Strategy 3 - Expected Values of Trading with Spreadbetting (X = E]Pn] - E[Pn-1]) (See workbook)
 
 P0 = close_prices[0] 
@@ -162,6 +191,7 @@ ax[0].plot(dates, compound_return1a, 'r', label='S&P500, f=%.2f, r=0%%'%f1a)
 ax[0].plot(dates, compound_return1c, 'b', label='S&P500, f=%.2f, r=4%%'%f1c)
 ax[0].plot(dates, compound_return1b, 'g', label='S&P500, f=%.2f/2 (Half Kelly)'%f1a)
 ax[0].plot(dates, compound_return1d, 'c', label='S&P500, f=1 (No Mgmt)')
+ax[0].plot(dates[wf['start']:], compound_return1e, 'm', label='S&P500, Walk forward f, r=0%')
 
 handles, labels = ax[0].get_legend_handles_labels()
 ax[0].legend(handles, labels, loc=2)
@@ -179,6 +209,7 @@ ax[1].grid();
 ax[1].plot(dates, compound_return2a, 'r', label='S&P500, f=%.2f/Pn, r=0%%' % f1a)
 ax[1].plot(dates, compound_return2c, 'b', label='S&P500, f=%.2f/Pn, r=4%%' % f1c)
 ax[1].plot(dates, compound_return2b, 'g', label='S&P500, f=%.2f/2Pn (Half Kelly)' % f1a)
+ax[1].plot(dates, compound_return2d, 'c', label='S&P500, Rolling 1 year f/Pn, r=4%')
 
 handles, labels = ax[1].get_legend_handles_labels()
 ax[1].legend(handles, labels, loc=2)
@@ -8,7 +8,9 @@ import matplotlib.ticker as ticker
 import sys as sys
 from finance import *
 from stockUtils import *
+from stockData import *
 from strategy import *
+from kelly import *
 
 # ======================
 # Instance of a Strategy
@@ -64,6 +66,13 @@ portfolio_list = [ \
     SpreadsPortfolio(strategy_list[:2], name='Portfolio', kelly=1.0, creditRate=0.04) \
     ]
 
+# Multi-asset Kelly portfolio of the shares, re-allocated monthly from the trailing year of returns
+creditRate = 0.04
+asset_returns = column_stack((net_return(prices1), net_return(prices2)))
+kelly_weights = rollingKelly(asset_returns, window=252, every=21, r=creditRate, leverage=4.0)
+kelly_return = (kelly_weights * asset_returns).sum(axis=1) + (1.0 - kelly_weights.sum(axis=1)) * ((1 + creditRate) ** (1.0/252) - 1)
+kelly_curve = np.insert(cumprod(1 + kelly_return), 0, 1)
+
 # ==================
 # Display Statistics
 # ==================
@@ -71,6 +80,8 @@ portfolio_list = [ \
 for strategy in portfolio_list:
     strategy.display()
 
+print ("Multi-asset Kelly weights (latest) : %s" % ", ".join("%.2f" % f for f in kelly_weights[-1]))
+
 # ====
 # Plot
 # ====
@@ -84,6 +95,8 @@ maxc = 0
 for strategy in portfolio_list:
     minc = min(minc, min(strategy.compound_return))
     maxc = max(maxc, max(strategy.compound_return))
+minc = minimum(minc, kelly_curve.min())
+maxc = maximum(maxc, kelly_curve.max())
 ax.set_title('Portfolio Architecture');
 ax.set_yscale('log', basey=e)
 ax.set_yticks([.1,.2,.3,.4,.5,.6,.7,.8,.9,1,2,3,4,5,6,7,8,9,10,20,30,40,50,100,200,300,400,500])
@@ -98,6 +111,8 @@ for i in range(0, len(portfolio_list)):
     ret = portfolio_list[i].compound_return
     ax.plot_date(dates, ret, colors[i], label=portfolio_list[i].name)
 
+ax.plot_date(dates, kelly_curve, colors[len(portfolio_list)], label='Multi-asset Kelly (Shares)')
+
 handles, labels = ax.get_legend_handles_labels()
 ax.legend(handles, labels, loc=2)
 
@@ -8,7 +8,9 @@ import matplotlib.ticker as ticker
 import sys as sys
 from finance import *
 from stockUtils import *
+from stockData import *
 from strategy import *
+from plotUtils import *
 
 # ======================
 # Instance of a Strategy
@@ -71,7 +73,7 @@ colors = ['g','b','r','c','m','y'] # Allows for 6 plots
 
 for i in range(0, len(portfolio_list)):
     ret = portfolio_list[i].compound_return
-    ax.plot(dates, ret, colors[i], label=portfolio_list[i].name)
+    plotDecimated(ax, dates, ret, colors[i], label=portfolio_list[i].name)
 
 handles, labels = ax.get_legend_handles_labels()
 ax.legend(handles, labels, loc=2)
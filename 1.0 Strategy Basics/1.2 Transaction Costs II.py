@@ -52,6 +52,8 @@ import matplotlib.dates as mdates
 import matplotlib.ticker as ticker
 from finance import *
 from stockUtils import *
+from stockData import *
+from backtest import *
 
 M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "02/01/1993", "12/28/2007");
 
@@ -104,6 +106,17 @@ strategy2b = np.insert(strategy2b,0,1)
 
 W2b = cumprod(strategy2b) # W(1+fr) - aX
 
+# Simulated rebalancing : the same strategies run through the backtest engine, rebalanced daily and only when
+# the exposure drifts outside a band around f (fewer trades, less cost, a little tracking error)
+
+bands = [0.0, 0.25, 1.0]
+sim1 = backtest(close_prices, f1, cost=a1, band=bands, rate=r)
+sim2 = backtest(close_prices, f1, pip_cost=a2, band=bands, margin=margin, rate=r)
+
+for i in range(len(bands)):
+    print ("Band %.2f : Shares %.2f (%d trades), Spreads %.2f (%d trades)" % (bands[i], sim1['equity'][-1, i], \
+        sim1['trades'][i], sim2['equity'][-1, i], sim2['trades'][i]))
+
 # ====
 # Plot
 # ====
@@ -124,6 +137,7 @@ ax[0].grid();
 
 ax[0].plot(dates, W1a, 'r', label='No TxCosts')
 ax[0].plot(dates, W1b, 'b', label='TxCosts = %.1f%%' % (a1*100))
+ax[0].plot(dates, sim1['equity'][:, 1], 'g', label='TxCosts = %.1f%%, Band = %.2f' % (a1*100, bands[1]))
 
 handles, labels = ax[0].get_legend_handles_labels()
 ax[0].legend(handles, labels, loc=2)
@@ -140,6 +154,7 @@ ax[1].grid();
 
 ax[1].plot(dates, W2a, 'r', label='No TxCosts')
 ax[1].plot(dates, W2b, 'b', label='TxCosts = %d pip(s)' % (a2*2))
+ax[1].plot(dates, sim2['equity'][:, 1], 'g', label='TxCosts = %d pip(s), Band = %.2f' % (a2*2, bands[1]))
 
 handles, labels = ax[1].get_legend_handles_labels()
 ax[1].legend(handles, labels, loc=2)
@@ -8,7 +8,9 @@ import matplotlib.ticker as ticker
 import sys as sys
 from finance import *
 from stockUtils import *
+from stockData import *
 from strategy import *
+from plotUtils import *
 
 # ======================
 # Instance of a Strategy
@@ -63,7 +65,7 @@ colors = ['g','b','r','c','m','y'] # Allows for 6 plots
 
 for i in range(0, len(strategy_list)):
     ret = strategy_list[i].compound_return
-    ax.plot(M['Date'], ret, colors[i], label=strategy_list[i].name)
+    plotDecimated(ax, M['Date'], ret, colors[i], label=strategy_list[i].name)
 
 handles, labels = ax.get_legend_handles_labels()
 ax.legend(handles, labels, loc=2)
@@ -27,6 +27,8 @@ import matplotlib.dates as mdates
 import datetime as dt
 from finance import *
 from stockUtils import *
+from stockData import *
+from pairs import *
 
 result = loadPair(STOCK_ROOT+'/2012/^DJI.csv', STOCK_ROOT+'/2012/^GSPC.csv', "01/02/2008", "01/05/2010");
       
@@ -41,7 +43,14 @@ line = slope*prices1+intercept
 
 formula = "y = %.2fx + %.2f" % (slope, intercept)
 
-fig, ax = plt.subplots(2)
+# Engle-Granger test of the pair (the same screen scales to every pair of a universe)
+screen = cointegrationScreen(column_stack((prices1, prices2)))
+print ("Hedge ratio = %.4f, ADF statistic = %.2f (5%% critical value %.2f)" % (screen.slope[0], screen.adf[0], EG_CRITICAL[0.05]))
+
+# Rolling one year hedge ratio, re-estimated every day
+rolling = rollingOLS(prices1, prices2, window=252)
+
+fig, ax = plt.subplots(3)
 
 # Scatter Plot with Regression line
 
@@ -61,6 +70,16 @@ handles, labels = ax[1].get_legend_handles_labels()
 ax[1].legend(handles, labels, loc=4)
 plt.setp( ax[1].xaxis.get_majorticklabels(), rotation=30 )
 
+# Residual of the rolling regression (Basket value with a daily re-estimated hedge ratio)
+
+ax[2].set_title("Basket Value (Rolling 252 day hedge ratio)")
+ax[2].plot(dates, rolling['residual'], label='Basket Value')
+ax[2].plot(dates, zeros(len(dates)), 'r', label='Mean');
+ax[2].fmt_xdata = mdates.DateFormatter('%Y-%m-%d')
+handles, labels = ax[2].get_legend_handles_labels()
+ax[2].legend(handles, labels, loc=4)
+plt.setp( ax[2].xaxis.get_majorticklabels(), rotation=30 )
+
 mng = plt.get_current_fig_manager()
 mng.resize(1280,960)
 plt.show()
@@ -13,6 +13,8 @@ import matplotlib.dates as mdates
 import matplotlib.ticker as ticker
 from finance import *
 from stockUtils import *
+from stockData import *
+from signals import *
 
 M = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
 
@@ -22,36 +24,25 @@ dates = M['Date']
 
 benchmark = compound_return(close_prices) 
 
-# Strategy 1
-N = len(close_prices);
-strategy1 = range(0,N)
-strategy1[0] = 1;
-for n in range (1,N):
-    if close_prices[n-1] > open_prices[n-1] :
-        strategy1[n] = close_prices[n] / open_prices[n];
-    else:
-        strategy1[n] = open_prices[n] / close_prices[n];
+# Positions are decided on the previous day, so there is no position on the first day
+prev_up = close_prices[:-1] > open_prices[:-1]
+prev_down = close_prices[:-1] < open_prices[:-1]
 
-compound_return1 = cumprod(strategy1);
-log_return1 = cumsum(log(strategy1));
+rules = vstack((zeros((1, 2)), column_stack(( \
+    where(prev_up, 1.0, -1.0),   # Strategy 1 : long after an up day, short otherwise
+    where(prev_down, 1.0, -1.0), # Strategy 2 : long after a down day, short otherwise
+    ))))
+
+strategies, compound_returns, log_returns = signal_returns(rules, open_prices, close_prices)
+
+strategy1, strategy2 = strategies.T
+compound_return1, compound_return2 = compound_returns.T
+log_return1, log_return2 = log_returns.T
 
 # ma200 = zeros(1,N);
 # for n=200:N
 #     ma200(n) = mean(returns(n-200+1:n));
 # end;
-
-# Strategy 2
-N = len(close_prices);
-strategy2 = range(0,N)
-strategy2[0] = 1;
-for n in range (1,N):
-    if close_prices[n-1] < open_prices[n-1] :
-        strategy2[n] = close_prices[n] / open_prices[n];
-    else:
-        strategy2[n] = open_prices[n] / close_prices[n];
-        
-compound_return2 = cumprod(strategy2);
-log_return2 = cumsum(log(strategy2));
           
 # Plot
 fig, ax = plt.subplots(1)
@@ -30,6 +30,8 @@ import matplotlib.dates as mdates
 import datetime as dt
 from finance import *
 from stockUtils import *
+from stockData import *
+from covariance import *
 
 result = loadPair(STOCK_ROOT+'/2012/^DJI.csv', STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
       
@@ -70,3 +72,12 @@ print ("                          X        Y")
 print ("                  X [ %.6f, %.6f ]" % (var_x,manual_cov))
 print ("                  Y [ %.6f, %.6f ]" % (manual_cov,var_y))
 
+# Covariance engine : full sample, rolling one year and exponentially weighted (quarter halflife)
+returns = column_stack((prices1, prices2))
+rolling_corr = correlation(covariance(returns, window=252))[:, 0, 1]
+ewma_corr = correlation(covariance(returns, halflife=63))[:, 0, 1]
+
+print ("Engine Covariance = %.4f" % covariance(returns)[0][1])
+print ("Rolling 252 day Correlation : min = %.4f, max = %.4f, last = %.4f" % (rolling_corr.min(), rolling_corr.max(), rolling_corr[-1]))
+print ("EWMA Correlation (last) = %.4f" % ewma_corr[-1])
+
@@ -25,11 +25,14 @@
 # 
 
 from numpy import *
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import datetime as dt
 from finance import *
 from stockUtils import *
+from stockData import *
+from autocorrelation import *
 
 result = loadStockData(STOCK_ROOT+'/2012/^GSPC.csv', "01/05/2000", "01/05/2010");
 
@@ -37,44 +40,22 @@ dates = result['Date']
 
 returns = log(gross_return(result['Close']));
 last = len(returns) - 1;
-coefficients = zeros(500);
 
-fig, ax = plt.subplots(2)
-
-# Autocorrelation of log returns
-for i in range(0,500):
-
-    series1 = returns[last - 200:last]
-    series2 = returns[last - 200 - i:last - i]
+# Autocorrelation of log returns and of absolute log returns (volatility), over a 200 day window
+coefficients = autocorrelation(vstack((returns[:last], abs(returns[:last]))), 500, window=200)
 
-
-    # Now do it with numpy to check the values
-    M = vstack((series1, series2));
-    coefficients[i] = corrcoef(M)[0][1]
+fig, ax = plt.subplots(2)
 
 chart = ax[0]
 chart.set_title('Autocorrelation function for S&P 500 returns');
-chart.plot(range(0,500), coefficients , label='AC(k) of Log Returns');
+chart.plot(range(0,500), coefficients[0] , label='AC(k) of Log Returns');
 chart.set_ylabel('Correlation')
 handles, labels = chart.get_legend_handles_labels()
 chart.legend(handles, labels)
 chart.grid();
 
-# Autocorrelation of absolute log returns (volatility)
-returns = abs(returns);
-
-for i in range(0,500):
-
-    series1 = returns[last - 200:last]
-    series2 = returns[last - 200 - i:last - i]
-
-
-    # Now do it with numpy to check the values
-    M = vstack((series1, series2));
-    coefficients[i] = corrcoef(M)[0][1]
-
 chart = ax[1]
-chart.plot(range(0,500), coefficients , label='AC(k) of Absolute Log Returns');
+chart.plot(range(0,500), coefficients[1] , label='AC(k) of Absolute Log Returns');
 chart.set_ylabel('Correlation')
 chart.set_xlabel('lag (k)')
 handles, labels = chart.get_legend_handles_labels()
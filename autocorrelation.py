@@ -0,0 +1,59 @@
+# Autocorrelation of return series
+#
+# The autocorrelation AC(k) of a series is its correlation with a copy of itself lagged by k bars. Rather than
+# one corrcoef per lag, all the lags are computed together : the full sample autocovariance through one FFT, and
+# the fixed window version (the last `window` bars against the same window shifted back by k) through one FFT
+# cross-correlation plus rolling sums for the mean and variance of every lagged window.
+#
+#   from autocorrelation import *
+#
+#   coefficients = autocorrelation(log_returns, 500, window=200)
+
+import numpy as np
+
+def autocorrelation(returns, max_lag, window=None, method='fft'):
+    ''' Autocorrelation AC(k), k = 0..max_lag-1, of a return series or of many series (one per row).
+
+    With window=None this is the full-sample ACF. With a window, the last `window` samples are correlated
+    against the same window shifted back by k samples, i.e. corrcoef(r[n-w:n], r[n-w-k:n-k]) for every k.
+    method='fft' computes all lags in one O(N log N) pass, method='direct' uses explicit lag products. '''
+
+    r = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    r = r - r.mean(axis=-1, keepdims=True)
+    n = r.shape[-1]
+
+    if window is None:
+        if method == 'fft':
+            nfft = 1 << int(2 * n - 1).bit_length()
+            f = np.fft.rfft(r, nfft)
+            acov = np.fft.irfft(f * np.conj(f), nfft)[:, :max_lag]
+        else:
+            acov = np.array([np.sum(r[:, k:] * r[:, :n - k], axis=-1) for k in range(max_lag)]).T
+        ac = acov / acov[:, :1]
+
+    else:
+        # Segment covering the fixed window plus every lagged copy of it
+        L = window + max_lag - 1
+        if L > n:
+            raise ValueError("Need at least %d samples for window=%d, max_lag=%d" % (L, window, max_lag))
+        seg = r[:, n - L:]
+        x = seg[:, L - window:]
+        x = x - x.mean(axis=-1, keepdims=True)
+
+        if method == 'fft':
+            nfft = 1 << int(L + window - 1).bit_length()
+            cross = np.fft.irfft(np.fft.rfft(seg, nfft) * np.conj(np.fft.rfft(x, nfft)), nfft)[:, :max_lag][:, ::-1]
+        else:
+            lagged = np.lib.stride_tricks.sliding_window_view(seg, window, axis=-1)[:, ::-1][:, :max_lag]
+            cross = np.einsum('ij,ikj->ik', x, lagged)
+
+        # Rolling sums give the mean and variance of every lagged window in O(1) each
+        c1 = np.concatenate((np.zeros((seg.shape[0], 1)), np.cumsum(seg, axis=-1)), axis=-1)
+        c2 = np.concatenate((np.zeros((seg.shape[0], 1)), np.cumsum(seg * seg, axis=-1)), axis=-1)
+        hi = np.arange(L, L - max_lag, -1)
+        sy = c1[:, hi] - c1[:, hi - window]
+        syy = c2[:, hi] - c2[:, hi - window]
+
+        ac = cross / np.sqrt(np.sum(x * x, axis=-1, keepdims=True) * (syy - sy * sy / window))
+
+    return ac[0] if np.asarray(returns).ndim == 1 else ac
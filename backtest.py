@@ -0,0 +1,82 @@
+# Bar by bar backtest engine
+#
+# The closed form rebalancing costs of the money management studies assume the position is rebalanced back
+# to f every day. The engine simulates it instead : holdings are carried from bar to bar (so the exposure
+# drifts with the price), and are only traded back to the target when a rebalance is due, paying the
+# transaction costs on the traded amount. All strategies are simulated together, one vectorised step per bar.
+#
+#   from backtest import *
+#
+#   result = backtest(close_prices, [[f_shares, f_half]], cost=0.001, band=0.1, rate=0.04)
+#   result['equity'], result['trades'], result['costs']
+
+import numpy as np
+
+
+def backtest(prices, target, cost=0.0, pip_cost=0.0, band=0.0, every=1, margin=None, rate=0.0, period=252.0):
+    ''' Simulate many strategies bar by bar, starting from a capital of 1.
+    
+    prices   : (bars,) or (bars x strategies) prices of the traded instrument(s)
+    target   : target exposure as a fraction of capital : a scalar, (strategies,) per strategy, (bars,) per bar
+               or (bars x strategies). A 1-D target with one value per bar is always taken as per bar.
+    cost     : proportional cost, as a fraction of the traded value
+    pip_cost : cost per unit traded per pip (e.g. half the spread)
+    band     : only rebalance when the exposure is more than `band` away from the target
+    every    : only rebalance every `every` bars
+    margin   : None for shares (the exposure is paid for, the remaining cash earns / pays `rate`), or the
+               margin fraction for spreads (only margin * exposure is tied up, the rest earns `rate`)
+    
+    A strategy whose capital reaches 0 is closed out on that bar and its equity stays at 0.
+    
+    Every parameter except prices broadcasts across strategies. Returns a dict of the equity curves
+    (bars x strategies), the number of rebalances and the total costs paid per strategy. '''
+    
+    P = np.asarray(prices, dtype=np.float64)
+    if P.ndim == 1:
+        P = P[:, np.newaxis]
+    T = P.shape[0]
+    target = np.asarray(target, dtype=np.float64)
+    if target.ndim == 1 and len(target) == T:
+        target = target[:, np.newaxis]
+    if target.ndim > 2 or (target.ndim == 2 and target.shape[0] not in (1, T)):
+        raise ValueError("target must be per strategy or have one row per bar (%d bars), got shape %s" % (T, target.shape))
+    S = np.broadcast(P[0], target[-1] if target.ndim == 2 else target, cost, pip_cost, band, rate).shape[0]
+    
+    P = P * np.ones(S)
+    target = target * np.ones((T, S))
+    cost, pip_cost, band, rate = [np.asarray(v, dtype=np.float64) * np.ones(S) for v in (cost, pip_cost, band, rate)]
+    credit = (1 + rate) ** (1.0/period) - 1
+    
+    equity = np.empty((T, S))
+    units = np.zeros(S)
+    capital = np.ones(S)
+    trades = np.zeros(S, dtype=int)
+    costs = np.zeros(S)
+    
+    for t in range(T):
+        if t > 0:
+            # Mark to market and accrue interest on the free cash
+            exposure = units * P[t-1]
+            cash = capital - (exposure if margin is None else margin * np.abs(exposure))
+            capital = capital + units * (P[t] - P[t-1]) + cash * credit
+        
+        # A ruined strategy is closed out at once, whatever the rebalance schedule, free of costs, and stays flat
+        ruined = capital <= 0
+        capital = np.where(ruined, 0.0, capital)
+        units = np.where(ruined, 0.0, units)
+        
+        # Rebalance back to the target when due
+        if t % every == 0:
+            desired = target[t] * capital / P[t]
+            drift = np.abs(units * P[t] / np.where(ruined, 1.0, capital) - target[t])
+            trade = ((drift > band) | (t == 0)) & ~ruined
+            delta = np.where(trade, desired - units, 0.0)
+            fee = cost * np.abs(delta) * P[t] + pip_cost * np.abs(delta)
+            capital = capital - fee
+            units = np.where(capital > 0, units + delta, 0.0)
+            costs += fee
+            trades += (delta != 0)
+        
+        equity[t] = np.maximum(capital, 0.0)
+    
+    return {'equity': equity, 'trades': trades, 'costs': costs}
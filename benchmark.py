@@ -0,0 +1,345 @@
+# Benchmarks of the hot paths of the studies
+#
+# Times the loaders, return transforms, drawdown, stable distribution, covariance, autocorrelation, tail,
+# pairs, portfolio and strategy functions on synthetic data, so it runs offline without the files under
+# STOCK_ROOT. Prices are generated as geometric brownian motion or with heavy (student t) tailed returns,
+# for a range of history lengths (bars) and universe sizes (symbols) :
+#
+#   small  : 1k bars, 1 / 100 symbols
+#   medium : 1k / 100k bars, 1 / 100 / 5,000 symbols
+#   large  : 1k / 100k / 10M bars, 1 / 100 / 5,000 symbols
+#
+# Combinations too large for a benchmark are skipped (see MAX_CELLS and the limits of each benchmark).
+#
+# Benchmarks of the external modules (finance, stable, strategy) run when they can be imported, and are
+# reported as skipped otherwise. Any other error is a failure : it is reported and the run exits non-zero.
+#
+# Results are written as JSON (benchmark.json by default, ignored by git), and can be compared against a
+# previous run :
+#
+#   python benchmark.py --size medium --output today.json --compare yesterday.json
+#   python benchmark.py --filter covariance
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import timeit
+import argparse
+import platform
+import tempfile
+import traceback
+import datetime as dt
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+import stockData
+from stockData import *
+from stockReturns import *
+from spreadBetting import *
+import drawdown
+import strategyStats
+import covariance
+import autocorrelation
+import tails
+import pairs
+import kelly
+import backtest
+
+SIZES = {
+    'small': ([1000], [1, 100]),
+    'medium': ([1000, 100000], [1, 100, 5000]),
+    'large': ([1000, 100000, 10000000], [1, 100, 5000]),
+    }
+
+# Largest bars x symbols array generated
+MAX_CELLS = 20000000
+
+# ======================
+# Synthetic prices
+# ======================
+
+def gbmPrices(bars, symbols=1, mu=0.05, sigma=0.2, period=252.0, seed=0):
+    ''' (bars x symbols) geometric brownian motion prices starting at 100 '''
+    rng = np.random.RandomState(seed)
+    steps = (mu - sigma ** 2 / 2) / period + sigma / np.sqrt(period) * rng.standard_normal((bars, symbols))
+    steps[0] = 0
+    return 100.0 * np.exp(np.cumsum(steps, axis=0))
+
+def heavyTailPrices(bars, symbols=1, df=3.0, mu=0.05, sigma=0.2, period=252.0, seed=0):
+    ''' (bars x symbols) prices with student t distributed log returns (df degrees of freedom, unit variance scaled) '''
+    rng = np.random.RandomState(seed)
+    shocks = rng.standard_t(df, (bars, symbols)) * np.sqrt((df - 2) / df)
+    steps = mu / period + sigma / np.sqrt(period) * shocks
+    steps[0] = 0
+    return 100.0 * np.exp(np.cumsum(steps, axis=0))
+
+def writeCSV(filename, prices, start='2000-01-03'):
+    ''' Write a Yahoo style CSV file (newest first) of one price series on consecutive business days '''
+    dates = np.busday_offset(np.datetime64(start, 'D'), np.arange(len(prices)), roll='forward')
+    volume = np.full(len(prices), 1000000)
+    table = np.column_stack((prices, prices * 1.01, prices * 0.99, prices, volume, prices))[::-1]
+    with open(filename, 'w') as f:
+        f.write('Date,Open,High,Low,Close,Volume,Adj Close\n')
+        for day, row in zip(dates[::-1].astype(str), table):
+            f.write('%s,%.4f,%.4f,%.4f,%.4f,%d,%.4f\n' % ((day,) + tuple(row)))
+
+# ======================
+# Benchmarks
+# ======================
+#
+# Each benchmark is (name, max bars, max symbols, setup). setup(prices, workdir) receives the (bars x symbols)
+# prices and returns the function to time.
+
+def _loadStockData(P, workdir):
+    filename = os.path.join(workdir, 'S0.csv')
+    writeCSV(filename, P[:, 0])
+    openCache(filename)
+    return lambda: loadStockData(filename, '01/01/2001', '12/31/2030')
+
+def _parseCSV(P, workdir):
+    filename = os.path.join(workdir, 'S0.csv')
+    writeCSV(filename, P[:, 0])
+    return lambda: stockData._parseCSV(filename)
+
+def _loadAligned(P, workdir):
+    filenames = [os.path.join(workdir, 'S%d.csv' % i) for i in range(P.shape[1])]
+    for i, filename in enumerate(filenames):
+        writeCSV(filename, P[:, i])
+        openCache(filename)
+    return lambda: loadAligned(filenames, '01/01/2000', '12/31/2030', fill='ffill')
+
+def _returns(P, workdir):
+    def run():
+        R = Returns(P, pad=True)
+        return R.net, R.log, R.compound, R.cumulative, R.percent
+    return run
+
+def _logReturnOut(P, workdir):
+    out = np.empty((P.shape[0] - 1, P.shape[1]))
+    return lambda: logReturn(P, out=out)
+
+def _financeReturns(P, workdir):
+    import finance
+    x = P[:, 0]
+    return lambda: (finance.net_return(x), np.log(finance.gross_return(x)), finance.compound_return(x))
+
+def _drawdown(P, workdir):
+    curves = np.ascontiguousarray(P.T)
+    return lambda: drawdown.drawdown(curves)
+
+def _runningDrawdown(P, workdir):
+    curves = np.ascontiguousarray(P.T)
+    return lambda: drawdown.running_drawdown(curves, window=252)
+
+def _strategy(P, workdir):
+    returns = np.ascontiguousarray((P[1:] / P[:-1] - 1).T)
+    return lambda: [strategyStats.Strategy(r, kelly=1.0, r=0.04) for r in returns]
+
+def _strategyGrid(P, workdir):
+    returns = P[1:, 0] / P[:-1, 0] - 1
+    fractions = np.linspace(0, 1, P.shape[1])
+    return lambda: strategyStats.StrategyGrid(returns, kelly=fractions, r=0.04)
+
+def _portfolio(P, workdir):
+    import strategy
+    returns = (P[1:] / P[:-1] - 1).T
+    return lambda: strategy.Portfolio([strategy.StocksStrategy(r, txCost=0) for r in returns], name='Portfolio', kelly=1.0)
+
+def _stablePdf(P, workdir):
+    import stable
+    x = np.linspace(-10, 10, P.shape[0])
+    return lambda: stable.pdf(x, 1.7, 0.1)
+
+def _stableCdf(P, workdir):
+    import stable
+    x = np.linspace(-10, 10, P.shape[0])
+    return lambda: stable.cdf(x, 1.7, 0.1)
+
+def _stableFit(P, workdir):
+    import stable
+    returns = np.diff(np.log(P[:, 0]))
+    return lambda: stable.fit(returns)
+
+def _covariance(P, workdir, **kwargs):
+    returns = P[1:] / P[:-1] - 1
+    return lambda: covariance.covariance(returns, **kwargs)
+
+def _autocorrelation(P, workdir, **kwargs):
+    returns = np.ascontiguousarray(np.diff(np.log(P), axis=0).T)
+    return lambda: autocorrelation.autocorrelation(returns, 100, **kwargs)
+
+def _tailIndex(P, workdir):
+    returns = np.ascontiguousarray(np.diff(np.log(P), axis=0).T)
+    return lambda: tails.tailIndex(returns, fractions=[0.01, 0.025, 0.05, 0.1])
+
+def _rollingOLS(P, workdir):
+    x = np.ascontiguousarray(P.T)
+    y = np.roll(x, 1, axis=0)
+    return lambda: pairs.rollingOLS(x, y, window=252)
+
+def _cointegrationScreen(P, workdir):
+    return lambda: pairs.cointegrationScreen(P)
+
+def _kellyWeights(P, workdir):
+    returns = P[1:] / P[:-1] - 1
+    return lambda: kelly.kellyWeights(returns, r=0.04, leverage=4.0, long_only=True)
+
+def _rollingKelly(P, workdir):
+    returns = P[1:] / P[:-1] - 1
+    return lambda: kelly.rollingKelly(returns, r=0.04)
+
+def _backtest(P, workdir):
+    return lambda: backtest.backtest(P, 2.0, cost=0.001, band=0.1, rate=0.04)
+
+def _simulateKelly(P, workdir):
+    returns = P[1:, 0] / P[:-1, 0] - 1
+    return lambda: kelly.simulateKelly(returns, [0.5, 1.0, 2.0], paths=P.shape[1], seed=0)
+
+def _walkForward(P, workdir):
+    returns = np.ascontiguousarray((P[1:] / P[:-1] - 1).T)
+    return lambda: kelly.walkForward(returns, train=252, test=63)
+
+def _spreadStakes(P, workdir):
+    return lambda: spreadStakes(P * 10, window=252, r=0.04, margin=500.0)
+
+BENCHMARKS = [
+    ('stockData.parseCSV', 100000, 1, _parseCSV),
+    ('stockData.loadStockData', 100000, 1, _loadStockData),
+    ('stockData.loadAligned', 100000, 100, _loadAligned),
+    ('stockReturns.Returns', None, None, _returns),
+    ('stockReturns.logReturn.out', None, None, _logReturnOut),
+    ('finance.returns', None, 1, _financeReturns),
+    ('drawdown.drawdown', None, None, _drawdown),
+    ('drawdown.running_drawdown', None, None, _runningDrawdown),
+    ('strategyStats.Strategy', None, 100, _strategy),
+    ('strategyStats.StrategyGrid', 100000, None, _strategyGrid),
+    ('strategy.Portfolio', 100000, 100, _portfolio),
+    ('stable.pdf', 100000, 1, _stablePdf),
+    ('stable.cdf', 100000, 1, _stableCdf),
+    ('stable.fit', 100000, 1, _stableFit),
+    ('covariance', None, 5000, _covariance),
+    ('covariance.rolling', 1000, 100, lambda P, w: _covariance(P, w, window=252)),
+    ('covariance.ewma', 1000, 100, lambda P, w: _covariance(P, w, halflife=63)),
+    ('covariance.shrinkage', None, 5000, lambda P, w: _covariance(P, w, shrinkage=True)),
+    ('autocorrelation', None, None, _autocorrelation),
+    ('autocorrelation.window', None, None, lambda P, w: _autocorrelation(P, w, window=200)),
+    ('tails.tailIndex', None, None, _tailIndex),
+    ('pairs.rollingOLS', None, None, _rollingOLS),
+    ('pairs.cointegrationScreen', 100000, 100, _cointegrationScreen),
+    ('kelly.kellyWeights', None, 5000, _kellyWeights),
+    ('kelly.rollingKelly', 100000, 100, _rollingKelly),
+    ('backtest.backtest', 100000, 5000, _backtest),
+    ('kelly.simulateKelly', 100000, 5000, _simulateKelly),
+    ('kelly.walkForward', None, 5000, _walkForward),
+    ('spreadBetting.spreadStakes', None, None, _spreadStakes),
+    ]
+
+# ======================
+# Runner
+# ======================
+
+def measure(function, repeat=3, min_time=0.2):
+    ''' Best and mean time per call (seconds), calling the function enough times for each measurement to take min_time '''
+    function()
+    number = 1
+    while True:
+        total = timeit.timeit(function, number=number)
+        if total >= min_time or number >= 1000000:
+            break
+        number *= 10
+    times = [total / number] + [timeit.timeit(function, number=number) / number for i in range(repeat - 1)]
+    return min(times), sum(times) / len(times), number
+
+def run(size='small', pattern=None, generators=('gbm', 'heavy'), repeat=3):
+    ''' Run every benchmark (matching the regular expression pattern) over the sizes, returns a list of results '''
+    results = []
+    bar_sizes, symbol_sizes = SIZES[size]
+    makers = {'gbm': gbmPrices, 'heavy': heavyTailPrices}
+
+    for bars in bar_sizes:
+        for symbols in symbol_sizes:
+            if bars * symbols > MAX_CELLS:
+                continue
+            for generator in generators:
+                P = makers[generator](bars, symbols)
+
+                for name, max_bars, max_symbols, setup in BENCHMARKS:
+                    if pattern is not None and not re.search(pattern, name):
+                        continue
+                    if (max_bars is not None and bars > max_bars) or (max_symbols is not None and symbols > max_symbols):
+                        continue
+
+                    result = {'name': name, 'bars': bars, 'symbols': symbols, 'generator': generator}
+                    workdir = tempfile.mkdtemp()
+                    try:
+                        best, mean, number = measure(setup(P, workdir), repeat)
+                        result.update(best=best, mean=mean, number=number)
+                    except ImportError as e:
+                        result.update(skipped=str(e))
+                    except Exception:
+                        result.update(failed=traceback.format_exc())
+                    finally:
+                        shutil.rmtree(workdir, ignore_errors=True)
+
+                    results.append(result)
+                    if 'skipped' in result:
+                        print ("%-32s %9d bars %5d symbols %6s   skipped (%s)" % (name, bars, symbols, generator, result['skipped']))
+                    elif 'failed' in result:
+                        print ("%-32s %9d bars %5d symbols %6s   FAILED\n%s" % (name, bars, symbols, generator, result['failed']))
+                    else:
+                        print ("%-32s %9d bars %5d symbols %6s %12.6f s" % (name, bars, symbols, generator, result['best']))
+
+    return results
+
+def compare(results, previous):
+    ''' Print the ratio of the best times against a previous run '''
+    key = lambda r: (r['name'], r['bars'], r['symbols'], r['generator'])
+    before = dict((key(r), r) for r in previous['results'] if 'best' in r)
+    print ("")
+    print ("%-32s %9s %5s %6s %12s %12s %7s" % ('benchmark', 'bars', 'syms', 'gen', 'before', 'now', 'ratio'))
+    for r in results:
+        if 'best' in r and key(r) in before:
+            old = before[key(r)]['best']
+            print ("%-32s %9d %5d %6s %12.6f %12.6f %7.2f" % (key(r) + (old, r['best'], r['best'] / old)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the study hot paths on synthetic data')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--filter', default=None, help='only run benchmarks whose name matches this regular expression')
+    parser.add_argument('--generator', choices=['gbm', 'heavy', 'both'], default='gbm')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', default=None, help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    generators = ('gbm', 'heavy') if args.generator == 'both' else (args.generator,)
+    started = time.time()
+    results = run(args.size, args.filter, generators, args.repeat)
+
+    report = {
+        'date': dt.datetime.now().isoformat(),
+        'size': args.size,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'duration': time.time() - started,
+        'results': results,
+        }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print ("Results written to %s" % args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    failed = [r for r in results if 'failed' in r]
+    if failed:
+        print ("%d benchmarks failed" % len(failed))
+        sys.exit(1)
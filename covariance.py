@@ -0,0 +1,136 @@
+# Covariance matrices of asset returns
+#
+# Full sample, rolling window and exponentially weighted covariance matrices of a (dates x assets) return
+# matrix, optionally with Ledoit-Wolf shrinkage towards a scaled identity. The rolling covariance is updated
+# with rank-one changes of running sums as the window moves, instead of being recomputed for every window.
+#
+#   from covariance import *
+#
+#   S = covariance(returns)
+#   rolling_corr = correlation(covariance(returns, window=252))[:, 0, 1]
+#   ewma_corr = correlation(covariance(returns, halflife=63))[:, 0, 1]
+#   monthly = covariance(returns, window=252, dates=month_ends)   # only the rebalance dates
+#   for t, S in rollingCovariance(returns, window=252):            # one matrix at a time
+#       ...
+
+import numpy as np
+
+def _ledoitWolf(S, n, sum_x4):
+    ''' Ledoit-Wolf shrinkage of sample covariance S (of n demeaned observations) towards a scaled identity.
+    sum_x4 is the sum over observations of |x|^4. S already equal to its target (e.g. a single asset) is
+    returned unshrunk. '''
+    p = S.shape[-1]
+    mu = np.trace(S, axis1=-2, axis2=-1) / p
+    F = mu[..., np.newaxis, np.newaxis] * np.eye(p)
+    delta = np.sum((S - F) ** 2, axis=(-2, -1))
+    beta = np.minimum((sum_x4 - n * np.sum(S * S, axis=(-2, -1))) / (n * n), delta)
+    shrink = np.where(delta > 0, beta / np.where(delta > 0, delta, 1.0), 0.0)[..., np.newaxis, np.newaxis]
+    return shrink * F + (1 - shrink) * S
+
+def rollingCovariance(returns, window=None, halflife=None, shrinkage=False, dates=None):
+    ''' Rolling (window) or exponentially weighted (halflife) covariance matrices, yielded one at a time.
+    
+    Yields (t, S) with t the index of the last date of the window and S the (assets x assets) covariance
+    at that date, so only one matrix is held in memory. dates restricts the output to the given date
+    indices (e.g. rebalance dates) : the running sums still move through every date, but the covariance
+    and its shrinkage are only formed on the selected dates. '''
+    
+    X = np.asarray(returns, dtype=np.float64)
+    X = X - X.mean(axis=0) # Demean once, keeps the running sums well conditioned
+    T, N = X.shape
+    
+    first = 0 if halflife is not None else window - 1
+    selected = np.zeros(T, dtype=bool)
+    if dates is None:
+        selected[first:] = True
+    else:
+        dates = np.asarray(dates, dtype=np.int64)
+        if len(dates) and (dates.min() < first or dates.max() >= T):
+            raise ValueError("dates must be date indices in [%d, %d)" % (first, T))
+        selected[dates] = True
+    
+    if halflife is not None:
+        if shrinkage:
+            raise ValueError("Shrinkage is not supported for exponentially weighted covariance")
+        a = 1.0 - 0.5 ** (1.0 / halflife)
+        m = X[0].copy()
+        C = np.zeros((N, N))
+        for t in range(T):
+            d = X[t] - m
+            m += a * d
+            C = (1 - a) * (C + a * np.outer(d, d))
+            if selected[t]:
+                yield t, C
+        return
+    
+    # Running sums over the window : x, x x', |x|^2 x and |x|^4 (the last two for the shrinkage intensity)
+    q = np.sum(X * X, axis=1)
+    for t in range(window - 1, T):
+        k = t - window + 1
+        if k % window == 0:
+            # Recompute the sums exactly once per window length to stop rounding errors accumulating
+            W = X[k:t+1]
+            S1 = W.sum(axis=0)
+            S2 = np.dot(W.T, W)
+            S3 = np.dot(q[k:t+1], W)
+            S4 = np.sum(q[k:t+1] ** 2)
+        else:
+            new, old = X[t], X[k-1]
+            S1 += new - old
+            S2 += np.outer(new, new) - np.outer(old, old)
+            S3 += q[t] * new - q[k-1] * old
+            S4 += q[t] ** 2 - q[k-1] ** 2
+        
+        if not selected[t]:
+            continue
+        
+        m = S1 / window
+        S = S2 / window - np.outer(m, m)
+        if shrinkage:
+            # Sum of |x - m|^4 over the window, expanded in terms of the running sums
+            mm = np.dot(m, m)
+            x4 = S4 - 4 * np.dot(S3, m) + 4 * np.dot(m, np.dot(S2, m)) + 2 * mm * np.trace(S2) - 4 * mm * np.dot(S1, m) + window * mm * mm
+            S = _ledoitWolf(S, window, x4)
+        yield t, S * window / (window - 1.0)
+
+def covariance(returns, window=None, halflife=None, shrinkage=False, dtype=np.float64, dates=None):
+    ''' Covariance matrices of a (dates x assets) return matrix.
+    
+    window=None, halflife=None : full sample covariance (assets x assets), as numpy cov.
+    window                     : rolling covariance for every window end, (dates - window + 1, assets, assets).
+                                 Each step adds the new observation and removes the oldest one as rank-one
+                                 updates of the running sums instead of recomputing the window.
+    halflife                   : exponentially weighted covariance at every date, (dates, assets, assets).
+    
+    dates restricts the rolling / exponentially weighted output to the given date indices, in date order,
+    (len(dates), assets, assets) : for 500 assets over 5000 dates every window end takes 10GB, the month
+    ends about 0.5GB.
+    Use rollingCovariance to process the matrices one at a time instead.
+    
+    shrinkage applies Ledoit-Wolf shrinkage towards a scaled identity (full sample and rolling only).
+    dtype=float32 halves the memory of the result. '''
+    
+    if window is None and halflife is None:
+        X = np.asarray(returns, dtype=np.float64)
+        X = X - X.mean(axis=0)
+        T, N = X.shape
+        S = np.dot(X.T, X) / T
+        if shrinkage:
+            S = _ledoitWolf(S, T, np.sum(np.sum(X * X, axis=1) ** 2))
+        return (S * T / (T - 1.0)).astype(dtype)
+    
+    T, N = np.shape(returns)
+    if dates is not None:
+        count = len(np.unique(dates))
+    else:
+        count = T if halflife is not None else T - window + 1
+    
+    result = np.empty((count, N, N), dtype=dtype)
+    for k, (t, S) in enumerate(rollingCovariance(returns, window, halflife, shrinkage, dates)):
+        result[k] = S
+    return result
+
+def correlation(covariance):
+    ''' Correlation matrices from one or many covariance matrices '''
+    d = np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1))
+    return covariance / (d[..., :, np.newaxis] * d[..., np.newaxis, :])
@@ -0,0 +1,78 @@
+# Drawdown statistics of equity curves
+#
+# Drawdowns are computed from the running peak (np.maximum.accumulate) of a compound return curve, so the max
+# drawdown, the max drawdown duration, the start / end of the max drawdown and the full underwater curve all come
+# out of one vectorised pass. Inputs may be a single curve or many curves, one per row.
+#
+# running_drawdown gives the drawdown as a live monitor sees it at every bar : expanding (since the start of the
+# curve) or over a trailing window.
+#
+#   from drawdown import *
+#
+#   dd = drawdown(compound_return)
+#   dd['maxDD'], dd['maxDDD'], dd['start'], dd['end']
+#   maxDD(compound_returns)                       # (max drawdown, max duration) per row
+
+import numpy as np
+
+def _rolling_max(x, window):
+    ''' Maximum over the trailing window along the last axis in O(N) (van Herk / Gil-Werman) '''
+    n = x.shape[-1]
+    window = n if window > n else window
+    pad = (-n) % window
+    blocks = np.concatenate((x, np.full(x.shape[:-1] + (pad,), -np.inf)), axis=-1)
+    blocks = blocks.reshape(x.shape[:-1] + (-1, window))
+    prefix = np.maximum.accumulate(blocks, axis=-1).reshape(x.shape[:-1] + (-1,))
+    suffix = np.maximum.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(x.shape[:-1] + (-1,))
+
+    result = prefix[..., :n].copy()
+    result[..., window - 1:] = np.maximum(suffix[..., :n - window + 1], prefix[..., window - 1:n])
+    return result
+
+def drawdown(compound_return):
+    ''' Drawdown statistics of one or many compound return curves.
+
+    Returns a dict with the underwater curve (fractional drop below the running peak), the number of bars
+    since the last peak at every point, maxDD, maxDDD and the start (peak) and end (trough) indices of the
+    max drawdown. '''
+
+    compound_return = np.asarray(compound_return, dtype=float)
+    index = np.arange(compound_return.shape[-1])
+
+    peak = np.maximum.accumulate(compound_return, axis=-1)
+    underwater = 1 - compound_return / peak
+    last_peak = np.maximum.accumulate(np.where(compound_return >= peak, index, 0), axis=-1)
+    duration = index - last_peak
+
+    end = underwater.argmax(axis=-1)
+    start = np.take_along_axis(last_peak, np.expand_dims(end, -1), axis=-1)[..., 0]
+
+    return { \
+        'underwater': underwater, \
+        'duration': duration, \
+        'maxDD': underwater.max(axis=-1), \
+        'maxDDD': duration.max(axis=-1), \
+        'start': start, \
+        'end': end \
+        }
+
+def running_drawdown(compound_return, window=None):
+    ''' Drawdown as seen by a live monitor at every bar.
+
+    With window=None this is the expanding view : the underwater curve and the max drawdown / max
+    drawdown duration observed so far. With a window, the peak is the highest value of the trailing
+    window and the max drawdown is the worst such drop within the window (no duration is returned). '''
+
+    compound_return = np.asarray(compound_return, dtype=float)
+
+    if window is None:
+        dd = drawdown(compound_return)
+        return dd['underwater'], np.maximum.accumulate(dd['underwater'], axis=-1), np.maximum.accumulate(dd['duration'], axis=-1)
+
+    underwater = 1 - compound_return / _rolling_max(compound_return, window)
+    return underwater, _rolling_max(underwater, window), None
+
+def maxDD(compound_return):
+    ''' Max drawdown and max drawdown duration (in bars) of a compound return curve '''
+    dd = drawdown(compound_return)
+    return dd['maxDD'], dd['maxDDD']
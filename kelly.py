@@ -0,0 +1,214 @@
+# Kelly optimal allocations
+#
+# For a portfolio of assets with annualised mean returns M and covariance C, the Kelly optimal fractions
+# of capital are F = C^-1 (M - r). The solve uses one Cholesky factorisation of C, so the cost of an allocation
+# is dominated by that factorisation whatever the number of assets. C is the Ledoit-Wolf shrunk covariance, which
+# stays positive definite when there are more assets than bars in the estimation window.
+#
+#   from kelly import *
+#
+#   F = kellyWeights(asset_returns, r=0.04, kelly=0.5)
+#   weights = rollingKelly(asset_returns, window=252, every=21, r=0.04, leverage=4.0)
+#   outcomes = simulateKelly(returns, [0.25, 0.5, 1.0], paths=10000, method='stationary', r=0.04)
+#   outcomes['ruin']
+#   oos = walkForward(returns, train=756, test=63, kelly=0.5)
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from covariance import covariance, rollingCovariance
+
+
+def _kellySolve(M, C, r=0.0, kelly=1.0, leverage=None, long_only=False):
+    ''' Kelly fractions for annualised mean returns M and covariance C '''
+    F = np.zeros(len(M))
+    active = np.arange(len(M))
+    while len(active) > 0:
+        F[:] = 0
+        F[active] = cho_solve(cho_factor(C[np.ix_(active, active)]), M[active] - r)
+        if not long_only or (F[active] >= 0).all():
+            break
+        active = active[F[active] > 0]
+    
+    F = kelly * F
+    if leverage is not None:
+        gross = np.abs(F).sum()
+        if gross > leverage:
+            F = F * leverage / gross
+    return F
+
+def kellyWeights(returns, r=0.0, period=252.0, kelly=1.0, leverage=None, long_only=False):
+    ''' Kelly optimal fractions of capital for a (dates x assets) matrix of net returns.
+    
+    kelly scales the optimal fractions (e.g. 0.5 for half-Kelly), leverage caps the gross leverage sum(|F|)
+    and long_only removes assets with negative weights (re-solving on the remaining assets) until all
+    weights are non-negative. '''
+    
+    X = np.asarray(returns, dtype=np.float64)
+    return _kellySolve(X.mean(axis=0) * period, covariance(X, shrinkage=True) * period, r, kelly, leverage, long_only)
+
+def rollingKelly(returns, window=252, every=21, r=0.0, period=252.0, **kwargs):
+    ''' Kelly weights re-estimated every `every` bars from the trailing window of returns.
+    Each allocation is held until the next rebalance; there is no position before the first full window.
+    The shrunk covariance is only formed on the rebalance dates (rollingCovariance with dates).
+    Returns a (dates x assets) matrix of weights, one row per bar of returns. '''
+    
+    X = np.asarray(returns, dtype=np.float64)
+    weights = np.zeros(X.shape)
+    total = np.concatenate((np.zeros((1, X.shape[1])), np.cumsum(X, axis=0)))
+    
+    # The allocation from bar t on is estimated on X[t-window:t], whose last date is t-1
+    last = np.arange(window, X.shape[0], every) - 1
+    for t, C in rollingCovariance(X, window, shrinkage=True, dates=last):
+        M = (total[t+1] - total[t+1-window]) / window * period
+        weights[t+1:t+1+every] = _kellySolve(M, C * period, r, **kwargs)
+    return weights
+
+# ======================
+# Monte Carlo robustness of the Kelly fraction
+# ======================
+#
+# A backtest is a single historical path. To judge a fraction of kelly we need the distribution of its
+# outcomes : many alternative return paths are resampled from the history (block or stationary bootstrap, which
+# keep the short range dependence of the returns) or drawn from the fitted stable distribution, and every
+# fraction is run over every path.
+
+def blockBootstrap(n, paths, length, block=20, rng=np.random):
+    ''' Indices of (paths x length) resampled paths built from blocks of `block` consecutive returns (wrapping around) '''
+    starts = rng.randint(0, n, size=(paths, -(-length // block)))
+    index = (starts[:, :, np.newaxis] + np.arange(block)) % n
+    return index.reshape(paths, -1)[:, :length]
+
+def stationaryBootstrap(n, paths, length, block=20, rng=np.random):
+    ''' Indices of (paths x length) resampled paths built from blocks of random (geometric) length, mean `block` '''
+    new = rng.random_sample((paths, length)) < 1.0 / block
+    new[:, 0] = True
+    starts = rng.randint(0, n, size=(paths, length))
+    t = np.arange(length)
+    
+    # Each bar continues the block started at the most recent new block
+    last = np.maximum.accumulate(np.where(new, t, 0), axis=1)
+    return (starts[np.arange(paths)[:, np.newaxis], last] + t - last) % n
+
+def stableSample(alpha, beta, gamma, delta, size, rng=np.random):
+    ''' Stable random variables (S1 parameterisation) by the Chambers-Mallows-Stuck method '''
+    V = rng.uniform(-np.pi / 2, np.pi / 2, size)
+    W = rng.exponential(1.0, size)
+    
+    if alpha == 1:
+        X = (2 / np.pi) * ((np.pi / 2 + beta * V) * np.tan(V) - beta * np.log((np.pi / 2) * W * np.cos(V) / (np.pi / 2 + beta * V)))
+        return gamma * X + (2 / np.pi) * beta * gamma * np.log(gamma) + delta
+    
+    zeta = beta * np.tan(np.pi * alpha / 2)
+    B = np.arctan(zeta) / alpha
+    S = (1 + zeta ** 2) ** (1 / (2.0 * alpha))
+    X = S * np.sin(alpha * (V + B)) / np.cos(V) ** (1 / alpha) * (np.cos(V - alpha * (V + B)) / W) ** ((1 - alpha) / alpha)
+    return gamma * X + delta
+
+def simulateKelly(returns, fractions, paths=10000, length=None, method='stationary', block=20, params=None, \
+        r=0.0, period=252.0, ruin=0.5, chunk=None, seed=None):
+    ''' Monte Carlo distribution of the outcome of trading fixed fractions of capital.
+    
+    Return paths of `length` bars (default the length of the history) are resampled from the returns by a
+    'block' or 'stationary' bootstrap, or drawn from a 'stable' distribution with params = (alpha, beta, gamma,
+    delta). Every fraction is run over the same paths, with the uninvested capital earning r. Paths are
+    simulated `chunk` at a time as one (paths x fractions x bars) array, which bounds the memory used.
+    
+    Returns a dict of (paths x fractions) arrays of terminal wealth, maximum drawdown and ruin (the wealth
+    fell to `ruin` of the starting capital), plus the probability of ruin per fraction. '''
+    
+    returns = np.asarray(returns, dtype=np.float64)
+    fractions = np.atleast_1d(np.asarray(fractions, dtype=np.float64))
+    n = len(returns)
+    length = length or n
+    k = len(fractions)
+    chunk = chunk or int(np.maximum(1, 2**22 // (k * length)))
+    rng = np.random.RandomState(seed)
+    rf = (1 + r) ** (1.0/period) - 1
+    
+    wealth = np.empty((paths, k))
+    maxDD = np.empty((paths, k))
+    ruined = np.empty((paths, k), dtype=bool)
+    
+    for lo in range(0, paths, chunk):
+        hi = lo + chunk if lo + chunk < paths else paths
+        
+        if method == 'block':
+            X = returns[blockBootstrap(n, hi - lo, length, block, rng)]
+        elif method == 'stationary':
+            X = returns[stationaryBootstrap(n, hi - lo, length, block, rng)]
+        elif method == 'stable':
+            X = stableSample(*(tuple(params) + ((hi - lo, length), rng)))
+        else:
+            raise ValueError("Unknown method : %s" % method)
+        
+        # Log wealth of every (path, fraction), a bar losing everything gives -inf
+        growth = 1 + fractions[:, np.newaxis] * X[:, np.newaxis, :] + (1 - fractions[:, np.newaxis]) * rf
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_wealth = np.cumsum(np.log(np.maximum(growth, 0)), axis=-1)
+            peak = np.maximum(np.maximum.accumulate(log_wealth, axis=-1), 0)
+            drawdown = 1 - np.exp(log_wealth - peak)
+        
+        wealth[lo:hi] = np.exp(log_wealth[..., -1])
+        maxDD[lo:hi] = drawdown.max(axis=-1)
+        ruined[lo:hi] = log_wealth.min(axis=-1) <= np.log(ruin)
+    
+    return {'wealth': wealth, 'maxDD': maxDD, 'ruined': ruined, 'ruin': ruined.mean(axis=0)}
+
+# ======================
+# Walk forward
+# ======================
+#
+# A kelly leverage fitted on the whole history is then traded on that same history. Walk forward splits the
+# history into folds : the parameters are fitted on a train block and traded out of sample on the test block
+# that follows it, and the out of sample blocks are stitched into one equity curve.
+
+def walkForward(returns, train=756, test=63, anchored=False, kelly=1.0, r=0.0, period=252.0):
+    ''' Walk forward kelly trading of one return series, or of the best of a set of candidates (candidates x bars).
+    
+    Each fold fits the mean and variance of every candidate on its train block (the previous `train` bars, or all
+    previous bars when anchored), picks the candidate with the highest kelly growth rate g = r + (m-r)^2 / 2s^2
+    and trades it at kelly * (m-r)/s^2 over the next `test` bars. Candidates can be the same rule with different
+    parameters, so the rule parameters are fitted walk forward along with the leverage.
+    
+    All folds are fitted at once from prefix sums of the returns, so overlapping train blocks cost nothing extra.
+    
+    Returns a dict of the out of sample returns and compound return (starting at bar `train`), the start bar and
+    a record array of the folds (start, end, candidate, leverage, in sample growth). '''
+    
+    X = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    T = X.shape[1]
+    if train >= T:
+        raise ValueError("Walk forward needs more than train=%d bars for one fold, got %d" % (train, T))
+    rf = (1 + r) ** (1.0/period) - 1
+    
+    S1 = np.insert(np.cumsum(X, axis=1), 0, 0, axis=1)
+    S2 = np.insert(np.cumsum(X * X, axis=1), 0, 0, axis=1)
+    
+    # Train [lo, hi) and test [hi, end) blocks of every fold
+    hi = np.arange(train, T, test)
+    lo = np.zeros(len(hi), dtype=int) if anchored else hi - train
+    end = hi + test
+    end[-1] = T
+    
+    n = hi - lo
+    mean = (S1[:, hi] - S1[:, lo]) / n
+    var = (S2[:, hi] - S2[:, lo]) / n - mean * mean
+    m = mean * period
+    s2 = var * period
+    
+    leverage = kelly * (m - r) / s2
+    growth = r + leverage * (m - r) - s2 * leverage ** 2 / 2.0
+    best = np.argmax(growth, axis=0)
+    folds = np.arange(len(hi))
+    
+    # Out of sample returns of the chosen candidate at its fitted leverage
+    fold = (np.arange(train, T) - train) // test
+    f = leverage[best, folds][fold]
+    oos = f * X[best[fold], np.arange(train, T)] + (1.0 - f) * rf
+    
+    return {
+        'returns': oos,
+        'compound_return': np.cumprod(np.insert(1 + oos, 0, 1)),
+        'start': train,
+        'folds': np.rec.fromarrays([hi, end, best, leverage[best, folds], growth[best, folds]], \
+            names='start,end,candidate,leverage,growth')}
@@ -0,0 +1,120 @@
+# Hedge ratios of stock pairs
+#
+# A pair (or basket) is traded through the residual of a linear regression of one price on the other,
+# r = y - ax - c. rollingOLS re-estimates the hedge ratio a, the intercept c, the residual and its z-score
+# at every bar from running sums, so that each bar is an O(1) update, for one pair or many pairs at once.
+# cointegrationScreen runs the Engle-Granger test on every pair of a universe of aligned prices in a few
+# matrix products.
+#
+#   from pairs import *
+#
+#   rolling = rollingOLS(prices1, prices2, window=252)
+#   rolling['slope'], rolling['residual'], rolling['zscore']
+#   screen = cointegrationScreen(prices, min_correlation=0.8)
+#   screen[screen.adf < EG_CRITICAL[0.05]]
+
+import numpy as np
+
+def rollingOLS(x, y, window=None, halflife=None):
+    ''' Rolling regression of y on x (y = slope * x + intercept) at every bar, for one pair or many pairs (one per row).
+    
+    With neither window nor halflife the regression is expanding, a window gives a fixed length rolling
+    regression and a halflife (in bars) gives exponentially weighted estimates. Every estimate comes from
+    running sums of x, y, x^2, xy and y^2, so each bar is an O(1) update.
+    
+    Returns a dict of slope, intercept, residual (the basket value y - slope * x - intercept) and zscore
+    (the residual in units of the residual standard deviation over the window). '''
+    
+    single = np.ndim(x) == 1 and np.ndim(y) == 1
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    
+    # Centre on the first price to keep the running sums well conditioned
+    x0 = x[:, :1]
+    y0 = y[:, :1]
+    xc = x - x0
+    yc = y - y0
+    terms = np.array([np.ones(xc.shape), xc, yc, xc * xc, xc * yc, yc * yc])
+    
+    if halflife is not None:
+        decay = 0.5 ** (1.0 / halflife)
+        sums = np.empty(terms.shape)
+        running = np.zeros(terms.shape[:-1])
+        for t in range(terms.shape[-1]):
+            running = decay * running + terms[..., t]
+            sums[..., t] = running
+    else:
+        sums = np.cumsum(terms, axis=-1)
+        if window is not None:
+            sums[..., window:] = sums[..., window:] - sums[..., :-window]
+            sums[..., :window - 1] = np.nan
+    
+    n, Sx, Sy, Sxx, Sxy, Syy = sums
+    vxx = Sxx - Sx * Sx / n
+    cxy = Sxy - Sx * Sy / n
+    vyy = Syy - Sy * Sy / n
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = cxy / vxx
+        intercept = (y0 + Sy / n) - slope * (x0 + Sx / n)
+        residual = y - slope * x - intercept
+        zscore = residual / np.sqrt(np.maximum(vyy - slope * cxy, 0) / n)
+    
+    result = {'slope': slope, 'intercept': intercept, 'residual': residual, 'zscore': zscore}
+    if single:
+        result = dict((k, v[0]) for k, v in result.items())
+    return result
+
+# Engle-Granger critical values of the residual ADF statistic for two series (MacKinnon)
+EG_CRITICAL = {0.01: -3.90, 0.05: -3.34, 0.10: -3.04}
+
+def cointegrationScreen(prices, min_correlation=None):
+    ''' Engle-Granger screen of every pair of a universe of aligned price series (dates x symbols).
+    
+    For each pair i < j, series j is regressed on series i (hedge ratio and intercept) and the Dickey-Fuller
+    t-statistic of the residual is computed, i.e. the t-statistic of rho in de(t) = rho * e(t-1). Pairs whose
+    price correlation is below min_correlation are pruned first.
+    
+    No residual series is formed : every statistic is a quadratic form in the lagged / differenced price
+    moment matrices, so the cost is a few (dates x symbols) matrix products plus O(1) per pair.
+    
+    Returns a record array of (i, j, slope, intercept, correlation, adf), most stationary pair first. '''
+    
+    P = np.asarray(prices, dtype=np.float64)
+    P = P - P.mean(axis=0)
+    T = P.shape[0]
+    
+    # Moments of the prices, for the hedge ratios
+    C = np.dot(P.T, P) / T
+    
+    i, j = np.triu_indices(P.shape[1], 1)
+    correlation = C[i, j] / np.sqrt(C[i, i] * C[j, j])
+    if min_correlation is not None:
+        keep = np.abs(correlation) >= min_correlation
+        i, j, correlation = i[keep], j[keep], correlation[keep]
+    
+    slope = C[i, j] / C[i, i]
+    
+    # Moments of the lagged prices (L) and price differences (D), for the Dickey-Fuller regression
+    L = P[:-1]
+    D = np.diff(P, axis=0)
+    LL = np.dot(L.T, L)
+    LD = np.dot(L.T, D)
+    DD = np.dot(D.T, D)
+    
+    # With centred prices the intercept is 0 : e(t-1) = y - b x (lagged), de(t) = dy - b dx
+    b = slope
+    ee = LL[j, j] - 2 * b * LL[i, j] + b * b * LL[i, i]
+    ed = LD[j, j] - b * LD[j, i] - b * LD[i, j] + b * b * LD[i, i]
+    dd = DD[j, j] - 2 * b * DD[i, j] + b * b * DD[i, i]
+    
+    rho = ed / ee
+    sse = dd - rho * ed
+    adf = rho / np.sqrt(sse / (T - 2) / ee)
+    
+    # Intercepts of the regression on the original (uncentred) prices
+    means = np.asarray(prices, dtype=np.float64).mean(axis=0)
+    intercept = means[j] - slope * means[i]
+    
+    result = np.rec.fromarrays([i, j, slope, intercept, correlation, adf], names='i,j,slope,intercept,correlation,adf')
+    return result[np.argsort(result.adf)]
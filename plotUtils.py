@@ -0,0 +1,139 @@
+# Decimated plotting of long series
+#
+# An equity curve of a few thousand daily bars plots fine, but intraday or very long histories put millions of
+# points into matplotlib, which then takes seconds to draw and writes huge SVG / PDF files. A screen can only
+# show a couple of values per horizontal pixel, so each series is reduced to about that many points before it
+# is drawn :
+#
+#   minmax : the first, last, lowest and highest point of every bucket of bars. The extremes of the curve (its
+#            peaks and the bottoms of its drawdowns) are kept exactly.
+#   lttb   : Largest-Triangle-Three-Buckets, one point per bucket chosen to preserve the visual shape.
+#
+# plotDecimated draws a series on an axis like ax.plot, and re-decimates the visible part of it whenever the
+# x range changes (zoom / pan), so zooming in reveals the full detail.
+#
+#   from plotUtils import *
+#
+#   plotDecimated(ax, dates, compound_return, 'g', label='Strategy')
+
+import numpy as np
+import matplotlib.dates as mdates
+
+# ======================
+# Decimation
+# ======================
+
+def minMaxIndex(y, buckets):
+    ''' Indices of the first, last, min and max point of each of `buckets` equal buckets of y (sorted, unique) '''
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= 4 * buckets:
+        return np.arange(n)
+
+    # NaNs (e.g. before a rolling estimate starts) are never chosen as extremes
+    low_values = high_values = y
+    if np.isnan(y).any():
+        low_values = np.where(np.isnan(y), np.inf, y)
+        high_values = np.where(np.isnan(y), -np.inf, y)
+
+    # Whole buckets are a reshaped view of y, the last partial bucket is done on its own
+    size = -(-n // buckets)
+    whole = n // size * size
+    start = np.arange(0, n, size)
+    low = [start[:whole // size] + low_values[:whole].reshape(-1, size).argmin(axis=1)]
+    high = [start[:whole // size] + high_values[:whole].reshape(-1, size).argmax(axis=1)]
+    if whole < n:
+        low.append([whole + low_values[whole:].argmin()])
+        high.append([whole + high_values[whole:].argmax()])
+    end = np.minimum(start + size, n) - 1
+
+    return np.unique(np.concatenate([start, end] + low + high))
+
+def lttbIndex(y, points):
+    ''' Indices of `points` points of y chosen by Largest-Triangle-Three-Buckets (bars are taken as equally spaced) '''
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    # The first and last points are kept, the others are split into points - 2 buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    index = np.empty(points, dtype=int)
+    index[0] = 0
+    index[-1] = n - 1
+
+    x = np.arange(n, dtype=np.float64)
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+
+        # Average of the next bucket (the last point for the last bucket)
+        if b + 2 < len(edges):
+            cx = 0.5 * (edges[b + 1] + edges[b + 2] - 1)
+            cy = y[edges[b + 1]:edges[b + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+
+        # Point of this bucket forming the largest triangle with the previous choice and the next average
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        index[b + 1] = a
+
+    return index
+
+def decimate(y, points, method='minmax'):
+    ''' Indices of about `points` points of y, by 'minmax' or 'lttb' decimation '''
+    if method == 'minmax':
+        return minMaxIndex(y, max(points // 4, 1))
+    if method == 'lttb':
+        return lttbIndex(y, points)
+    raise ValueError("Unknown decimation method : %s" % method)
+
+# ======================
+# Plotting
+# ======================
+
+def _searchable(x):
+    ''' A sorted array of x and a function converting axis limits to its units, to find the visible bars '''
+    if np.issubdtype(x.dtype, np.number):
+        return x, lambda value: value
+    if np.issubdtype(x.dtype, np.datetime64):
+        epoch = np.datetime64(mdates.get_epoch(), 'us')
+        return x, lambda value: epoch + np.timedelta64(int(round(value * 86400e6)), 'us')
+    # Python dates / datetimes : convert them once to matplotlib date numbers
+    return np.asarray(mdates.date2num(x), dtype=np.float64), lambda value: value
+
+def plotDecimated(ax, x, y, *args, **kwargs):
+    ''' ax.plot(x, y, *args, **kwargs) drawing only about 2 points per horizontal pixel of the visible range.
+
+    Extra keyword arguments : method ('minmax' or 'lttb') and points (number of points drawn, default twice the
+    width of the axis in pixels). x must be sorted. Returns the line. '''
+
+    method = kwargs.pop('method', 'minmax')
+    points = kwargs.pop('points', None)
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    def resolution():
+        return points or max(int(2 * ax.get_window_extent().width), 100)
+
+    state = {'view': (0, len(y), resolution())}
+    index = decimate(y, state['view'][2], method)
+    line, = ax.plot(x[index], y[index], *args, **kwargs)
+
+    def update(axis):
+        if 'keys' not in state:
+            state['keys'], state['limit'] = _searchable(x)
+        keys, limit = state['keys'], state['limit']
+        lo, hi = axis.get_xlim()
+        first = max(np.searchsorted(keys, limit(lo), side='left') - 1, 0)
+        last = min(np.searchsorted(keys, limit(hi), side='right') + 1, len(x))
+        view = (first, last, resolution())
+        if view == state['view']:
+            return
+        state['view'] = view
+        index = first + decimate(y[first:last], view[2], method)
+        line.set_data(x[index], y[index])
+
+    ax.callbacks.connect('xlim_changed', update)
+    return line
@@ -0,0 +1,299 @@
+# Headless report renderer for the study scripts
+#
+# The studies are interactive : they end in plt.show() and print their statistics to the console. This script
+# runs them without a display and renders a report for each one :
+#
+#   * each study runs in a worker process with the Agg backend, and plt.show() saves every open figure
+#     (PNG / SVG) instead of opening a window
+#   * everything the study prints is kept as its statistics
+#   * an HTML page per study shows the figures and the statistics, and an index page links all the studies
+#
+# A study can be rendered for many symbols : the symbol of the data file it loads (e.g. ^GSPC) is replaced by
+# each symbol in turn, giving one report per (study, symbol). A study that loads no file of the replaced symbol is
+# skipped for the other symbols, its report would not change with them.
+#
+# A report is only rendered again when its inputs change : the manifest written with each report records a
+# hash of the study script, of every repository module and data file it loaded and of its parameters, and a
+# study whose hashes all match its manifest is skipped.
+#
+#   python report.py                                              # every study, as written
+#   python report.py "1.0 Returns/3.0 Tails.py" --symbols AAPL MSFT IBM --processes 8
+#   python report.py --out E:/reports --formats png html --force
+#
+# Reports go to reports/ under the repository by default (ignored by git).
+
+import os
+import io
+import re
+import sys
+import json
+import glob
+import time
+import runpy
+import hashlib
+import argparse
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Loader functions whose file name arguments are redirected to the symbol being rendered
+LOADERS = ['loadStockData', 'loadStocks', 'loadPair', 'loadAligned']
+LOADER_MODULES = ['stockUtils', 'stockData']
+
+def studies():
+    ''' All study scripts of the repository (numbered file names) '''
+    return sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, '**', '[0-9]*.py'), recursive=True))
+
+def fileHash(filename):
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9.]+', '_', text).strip('_')
+
+# ======================
+# Jobs
+# ======================
+
+def makeJobs(scripts, out, symbols=None, replace='^GSPC', formats=('png', 'svg', 'html')):
+    ''' One job per (study, symbol), or per study when no symbols are given '''
+    jobs = []
+    for script in scripts:
+        for symbol in (symbols or [None]):
+            name = os.path.splitext(os.path.basename(script))[0]
+            params = {'replace': replace, 'symbol': symbol, 'formats': list(formats)}
+            jobs.append({ \
+                'script': os.path.join(ROOT, script), \
+                'name': name if symbol is None else '%s [%s]' % (name, symbol), \
+                'outdir': os.path.join(out, _slug(name if symbol is None else name + '_' + symbol)), \
+                'params': params})
+    return jobs
+
+def upToDate(job):
+    ''' True when the job has a successful (or skipped) report whose script, data file and parameter hashes still match '''
+    try:
+        with open(os.path.join(job['outdir'], 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return False
+
+    if manifest.get('status') not in ('ok', 'skipped') or manifest.get('params') != job['params']:
+        return False
+    if manifest.get('script') != fileHash(job['script']):
+        return False
+    for filename, digest in manifest.get('inputs', {}).items():
+        if not os.path.isfile(filename) or fileHash(filename) != digest:
+            return False
+    return True
+
+# ======================
+# Worker
+# ======================
+
+def _redirect(name, symbol, replace, loaded, redirected):
+    ''' Rewrite a data file name (or list of names) to the symbol being rendered, recording every file loaded
+    and every {original : rewritten} name '''
+    if isinstance(name, (list, tuple)):
+        return [_redirect(n, symbol, replace, loaded, redirected) for n in name]
+    if not isinstance(name, str) or not name.lower().endswith('.csv'):
+        return name
+    if symbol is not None:
+        folder, base = os.path.split(name)
+        if replace in base:
+            redirected[name] = os.path.join(folder, base.replace(replace, symbol))
+            name = redirected[name]
+    loaded.append(os.path.abspath(name))
+    return name
+
+def _repositoryModules():
+    ''' {name : file} of the loaded modules that live in the repository, except this one '''
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        filename = os.path.abspath(getattr(module, '__file__', None) or '')
+        if filename.startswith(ROOT + os.sep) and filename.endswith('.py') and filename != os.path.abspath(__file__):
+            modules[name] = filename
+    return modules
+
+def _wrap(function, symbol, replace, loaded, redirected):
+    def wrapper(*args, **kwargs):
+        return function(*[_redirect(a, symbol, replace, loaded, redirected) for a in args], **kwargs)
+    wrapper.function = function
+    return wrapper
+
+def _patchLoaders(symbol, replace, loaded, redirected):
+    for module_name in LOADER_MODULES:
+        try:
+            module = __import__(module_name)
+        except ImportError:
+            continue
+        for loader in LOADERS:
+            function = getattr(module, loader, None)
+            if function is None:
+                continue
+            # Workers render many jobs, wrap the original loader rather than a previous job's wrapper
+            function = getattr(function, 'function', function)
+            setattr(module, loader, _wrap(function, symbol, replace, loaded, redirected))
+
+def render(job):
+    ''' Run one study headlessly and write its figures, statistics, HTML page and manifest '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    started = time.time()
+    outdir = job['outdir']
+    params = job['params']
+    formats = params['formats']
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    figures = []
+    def show(*args, **kwargs):
+        for number in plt.get_fignums():
+            figure = plt.figure(number)
+            figure.set_size_inches(12.8, 9.6)   # the studies resize their window to 1280 x 960
+            for fmt in formats:
+                if fmt == 'html':
+                    continue
+                filename = 'figure%d.%s' % (len(figures) + 1, fmt)
+                figure.savefig(os.path.join(outdir, filename), dpi=100)
+            figures.append('figure%d' % (len(figures) + 1))
+        plt.close('all')
+
+    # Import the repository modules afresh, so that the ones this study uses are recorded as its inputs
+    for name in _repositoryModules():
+        del sys.modules[name]
+
+    loaded = []
+    redirected = {}
+    script_dir = os.path.dirname(job['script'])
+    for path in (ROOT, script_dir):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    _patchLoaders(params['symbol'], params['replace'], loaded, redirected)
+    plt.show = show
+
+    status = 'ok'
+    error = None
+    output = io.StringIO()
+    cwd = os.getcwd()
+    try:
+        os.chdir(script_dir)
+        with contextlib.redirect_stdout(output):
+            runpy.run_path(job['script'], run_name='__main__')
+            show()
+    except BaseException:
+        status = 'failed'
+        error = traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+        plt.close('all')
+
+    # A study that loads no file of the replaced symbol would give the same report for every symbol
+    if status == 'ok' and params['symbol'] is not None and not redirected:
+        status = 'skipped'
+        error = 'No data file of %s was loaded, nothing to replace by %s' % (params['replace'], params['symbol'])
+        figures = []
+
+    loaded.extend(_repositoryModules().values())
+
+    statistics = output.getvalue()
+    with open(os.path.join(outdir, 'statistics.txt'), 'w') as f:
+        f.write(statistics)
+
+    if 'html' in formats:
+        _writePage(job, figures, statistics, error)
+
+    inputs = dict((filename, fileHash(filename)) for filename in sorted(set(loaded)) if os.path.isfile(filename))
+    manifest = { \
+        'name': job['name'], \
+        'status': status, \
+        'script': fileHash(job['script']), \
+        'params': params, \
+        'inputs': inputs, \
+        'redirected': redirected, \
+        'figures': figures, \
+        'seconds': time.time() - started, \
+        'error': error}
+    with open(os.path.join(outdir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    return manifest
+
+# ======================
+# HTML
+# ======================
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def _writePage(job, figures, statistics, error):
+    image = 'png' if 'png' in job['params']['formats'] else 'svg'
+    parts = ['<html><head><meta charset="utf-8"><title>%s</title></head><body>' % _escape(job['name'])]
+    parts.append('<h1>%s</h1>' % _escape(job['name']))
+    for figure in figures:
+        parts.append('<p><img src="%s.%s"></p>' % (figure, image))
+    if statistics:
+        parts.append('<h2>Statistics</h2><pre>%s</pre>' % _escape(statistics))
+    if error:
+        parts.append('<h2>Error</h2><pre>%s</pre>' % _escape(error))
+    parts.append('</body></html>')
+    with open(os.path.join(job['outdir'], 'index.html'), 'w') as f:
+        f.write('\n'.join(parts))
+
+def writeIndex(out, jobs):
+    ''' Top level page linking the report of every job '''
+    rows = []
+    for job in jobs:
+        try:
+            with open(os.path.join(job['outdir'], 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            continue
+        link = os.path.relpath(os.path.join(job['outdir'], 'index.html'), out).replace(os.sep, '/')
+        rows.append('<tr><td><a href="%s">%s</a></td><td>%s</td><td>%d</td><td>%.1f s</td></tr>' % \
+            (link, _escape(job['name']), manifest['status'], len(manifest['figures']), manifest['seconds']))
+
+    with open(os.path.join(out, 'index.html'), 'w') as f:
+        f.write('<html><head><meta charset="utf-8"><title>Studies</title></head><body><h1>Studies</h1>\n')
+        f.write('<table><tr><th>Study</th><th>Status</th><th>Figures</th><th>Time</th></tr>\n')
+        f.write('\n'.join(rows))
+        f.write('\n</table></body></html>\n')
+
+# ======================
+# Main
+# ======================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the studies headlessly to PNG / SVG / HTML reports')
+    parser.add_argument('scripts', nargs='*', help='study scripts (default : all studies)')
+    parser.add_argument('--out', default=os.path.join(ROOT, 'reports'))
+    parser.add_argument('--symbols', nargs='*', default=None, help='render each study once per symbol')
+    parser.add_argument('--replace', default='^GSPC', help='symbol of the data files to replace by each symbol')
+    parser.add_argument('--formats', nargs='*', default=['png', 'svg', 'html'], choices=['png', 'svg', 'html'])
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='render even if the inputs are unchanged')
+    args = parser.parse_args()
+
+    scripts = [os.path.relpath(os.path.abspath(s), ROOT) for s in args.scripts] or studies()
+    jobs = makeJobs(scripts, os.path.abspath(args.out), args.symbols, args.replace, args.formats)
+    pending = [job for job in jobs if args.force or not upToDate(job)]
+    print ("%d reports, %d up to date" % (len(jobs), len(jobs) - len(pending)))
+
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+
+    with ProcessPoolExecutor(args.processes) as pool:
+        futures = dict((pool.submit(render, job), job) for job in pending)
+        for future in as_completed(futures):
+            manifest = future.result()
+            print ("%-60s %-7s %2d figures %6.1f s" % (manifest['name'], manifest['status'], \
+                len(manifest['figures']), manifest['seconds']))
+
+    writeIndex(args.out, jobs)
+    print ("Index written to %s" % os.path.join(args.out, 'index.html'))
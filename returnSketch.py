@@ -0,0 +1,232 @@
+# Streaming summaries of return distributions
+#
+# The distribution studies build the histogram and the empirical cdf from the full array of returns in memory
+# (histogram(returns) and sort(returns)). For tick returns over many years that array no longer fits. The
+# summaries here are updated chunk by chunk, take a fixed amount of memory, and can be merged, so that chunks,
+# files, symbols or processes can be summarised separately and combined :
+#
+#   Histogram          : fixed bins over a fixed range (with under / overflow counts)
+#   QuantileSketch     : KLL quantile sketch, rank error about 1/k of the sample size in the body of the
+#                        distribution, plus exact buffers of the `tail` smallest and largest values, so that
+#                        tail probabilities and tail exponent fits are exact
+#   ReturnDistribution : both of them, updated together
+#
+#   from returnSketch import *
+#
+#   summary = ReturnDistribution(-0.25, 0.25, 250)
+#   for chunk in chunks:
+#       summary.update(chunk)
+#   summary.merge(other_summary)
+#   density, edges = summary.histogram.density()
+#   x, cdf = summary.quantiles.ecdf()
+
+import numpy as np
+
+# ======================
+# Histogram
+# ======================
+
+class Histogram:
+    ''' Fixed bin histogram of a stream of values. Values outside [lo, hi] are counted as under / overflow. '''
+
+    def __init__(self, lo, hi, bins):
+        self.edges = np.linspace(lo, hi, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        lo, hi = self.edges[0], self.edges[-1]
+        self.counts += np.histogram(values, len(self.counts), range=(lo, hi))[0]
+        self.under += int(np.count_nonzero(values < lo))
+        self.over += int(np.count_nonzero(values > hi))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bins cannot be merged")
+        self.counts += other.counts
+        self.under += other.under
+        self.over += other.over
+        return self
+
+    @property
+    def n(self):
+        return int(self.counts.sum()) + self.under + self.over
+
+    def density(self):
+        ''' Probability density of the values within the range (as histogram(..., normed=True)), and the bin edges '''
+        total = self.counts.sum()
+        return self.counts / (float(total if total else 1) * np.diff(self.edges)), self.edges
+
+# ======================
+# Quantile sketch
+# ======================
+
+class QuantileSketch:
+    ''' KLL quantile sketch with exact tails.
+
+    Values are kept in levels of compactors : a value in level h stands for 2^h values of the stream. When a
+    level grows beyond its capacity (k at the top level, shrinking by 2/3 per level below) it is sorted and every
+    other value (from a random start) is promoted to the next level. The smallest and largest `tail` values are
+    also kept exactly, so ranks within `tail` of either end are exact, and up to 2 * tail values the whole
+    sample is known and every rank and quantile is exact. '''
+
+    def __init__(self, k=200, tail=1000, seed=None):
+        self.k = k
+        self.tail = tail
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.low = np.empty(0)
+        self.high = np.empty(0)
+        self.rng = np.random.RandomState(seed)
+
+    def _capacity(self, level):
+        return max(int(np.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - 1 - level))), 2)
+
+    def _compress(self):
+        while True:
+            over = [h for h in range(len(self.levels)) if len(self.levels[h]) > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            # An odd value out stays at this level, the others are halved into the next level
+            items = np.sort(self.levels[h])
+            keep = len(items) % 2
+            promoted = items[keep:][self.rng.randint(2)::2]
+            self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+            self.levels[h] = items[:keep]
+
+    def _tails(self, low, high):
+        if len(low) > self.tail:
+            low = np.partition(low, self.tail - 1)[:self.tail]
+        if len(high) > self.tail:
+            high = np.partition(high, len(high) - self.tail)[-self.tail:]
+        self.low = np.sort(low)
+        self.high = np.sort(high)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        self._tails(np.concatenate((self.low, values)), np.concatenate((self.high, values)))
+        return self
+
+    def merge(self, other):
+        ''' Add the summary of another stream (e.g. another chunk, symbol or process) '''
+        self.n += other.n
+        for h in range(len(other.levels)):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate((self.levels[h], other.levels[h]))
+        self._compress()
+        self._tails(np.concatenate((self.low, other.low)), np.concatenate((self.high, other.high)))
+        return self
+
+    def _weighted(self):
+        ''' The sketch values sorted, and their cumulative weights (approximate ranks) '''
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='mergesort')
+        return values[order], np.cumsum(weights[order])
+
+    def _exact(self):
+        ''' The whole sample sorted, when the two tail buffers between them hold all of it (n <= 2 * tail), else None.
+        The buffers then overlap : the largest values are the part of `high` beyond the values already in `low`. '''
+        if self.n > len(self.low) + len(self.high):
+            return None
+        return np.concatenate((self.low, self.high[len(self.low) + len(self.high) - self.n:]))
+
+    def rank(self, x):
+        ''' Number of values <= x (exact in the tails) '''
+        x = np.asarray(x, dtype=np.float64)
+        exact = self._exact()
+        if exact is not None:
+            return np.searchsorted(exact, x, side='right')
+
+        values, ranks = self._weighted()
+        index = np.searchsorted(values, x, side='right')
+        rank = np.where(index > 0, ranks[np.maximum(index - 1, 0)], 0.0)
+
+        # Exact where x falls within the tail buffers, and bounded by their sizes in between
+        rank = np.clip(rank, len(self.low), self.n - len(self.high))
+        rank = np.where(x < self.low[-1], np.searchsorted(self.low, x, side='right'), rank)
+        above = len(self.high) - np.searchsorted(self.high, x, side='right')
+        return np.where(x >= self.high[0], self.n - above, rank)
+
+    def cdf(self, x):
+        ''' Fraction of the values <= x '''
+        return self.rank(x) / float(self.n)
+
+    def quantile(self, q):
+        ''' Values at the probabilities q (exact in the tails) '''
+        q = np.asarray(q, dtype=np.float64)
+        r = np.clip(np.ceil(q * self.n).astype(np.int64), 1, self.n)   # 1-based rank
+        exact = self._exact()
+        if exact is not None:
+            return exact[r - 1]
+
+        # Body values come from the sketch, kept between the tail buffers so that quantiles stay monotonic
+        values, ranks = self._weighted()
+        result = values[np.minimum(np.searchsorted(ranks, r, side='left'), len(values) - 1)]
+        result = np.clip(result, self.low[-1], self.high[0])
+
+        lo = r <= len(self.low)
+        result = np.where(lo, self.low[np.clip(r - 1, 0, len(self.low) - 1)], result)
+        hi = self.n - r < len(self.high)
+        result = np.where(hi, self.high[np.clip(len(self.high) - 1 - (self.n - r), 0, len(self.high) - 1)], result)
+        return result
+
+    def ecdf(self, points=1000):
+        ''' Empirical cdf for plotting : every tail value with its exact plotting position rank / (n+1), and
+        `points` quantiles of the body in between (every value when the buffers hold the whole sample).
+        Returns sorted x and cdf values. '''
+        low = self.low
+        high = self.high
+        exact = self._exact()
+        if exact is not None:
+            x = exact
+            ranks = np.arange(1, self.n + 1, dtype=np.float64)
+        else:
+            body = (np.arange(points) + 0.5) / points
+            body = body[(body * self.n > len(low)) & (body * self.n < self.n - len(high))]
+            x = np.concatenate((low, self.quantile(body), high))
+            ranks = np.concatenate((np.arange(1, len(low) + 1), body * self.n, \
+                np.arange(self.n - len(high) + 1, self.n + 1)))
+        return x, ranks / (self.n + 1.0)
+
+    def tails(self):
+        ''' The exact tails : the smallest values (ascending) and the largest values (descending) '''
+        return self.low, self.high[::-1]
+
+# ======================
+# Return distribution
+# ======================
+
+class ReturnDistribution:
+    ''' A histogram and a quantile sketch of a stream of returns, updated and merged together '''
+
+    def __init__(self, lo, hi, bins, k=200, tail=1000, seed=None):
+        self.histogram = Histogram(lo, hi, bins)
+        self.quantiles = QuantileSketch(k, tail, seed)
+
+    def update(self, values):
+        self.histogram.update(values)
+        self.quantiles.update(values)
+        return self
+
+    def merge(self, other):
+        self.histogram.merge(other.histogram)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    @property
+    def n(self):
+        return self.quantiles.n
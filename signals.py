@@ -0,0 +1,30 @@
+# Returns of trading rules
+#
+# A trading rule is a series of positions, one per bar : +1 long, -1 short, 0 flat. The open to close returns of
+# any number of rules are computed in one pass over a (bars x rules) array of positions, working in log returns
+# so that a short (position -1) simply inverts the daily ratio close / open.
+#
+#   from signals import *
+#
+#   daily, compound, cumulative_log = signal_returns(positions, open_prices, close_prices)
+
+import numpy as np
+
+def signal_returns(positions, open_prices, close_prices):
+    ''' Open to close returns of one or many trading rules in a single pass.
+
+    positions holds the exposure over each bar, one column per rule : +1 long, -1 short, 0 flat, or a
+    fractional size. A full short earns open/close, i.e. the daily ratio close/open is raised to the power of
+    the position; a fractional size p has a linear exposure and earns 1 + p * (close/open - 1).
+    Returns the gross daily returns, the compound returns (cumprod) and the log returns (cumsum). '''
+
+    positions = np.asarray(positions, dtype=float)
+    ratio = np.asarray(close_prices, dtype=float) / np.asarray(open_prices, dtype=float)
+    if positions.ndim == 2:
+        ratio = ratio[:, np.newaxis]
+
+    ternary = (positions == -1) | (positions == 0) | (positions == 1)
+    gross_return = np.where(ternary, ratio ** np.where(ternary, positions, 0), 1 + positions * (ratio - 1))
+    log_return = np.log(gross_return)
+
+    return gross_return, np.cumprod(gross_return, axis=0), np.cumsum(log_return, axis=0)
@@ -0,0 +1,91 @@
+# Kelly sizing of spread bets across many instruments
+#
+# A spread bet pays a stake per pip, so the kelly optimal stake is a fraction of capital per pip :
+#
+#   f = (m - r) / (Pn * s^2)
+#
+# where m and s are the (annualised) mean and standard deviation of the instrument returns and Pn the current
+# price in pips. As the price moves the stake per pip has to follow it, and in practice m and s are not known
+# either and are estimated from a trailing window of returns.
+#
+# spreadStakes sizes every instrument of a (bars x instruments) price array at every bar in one pass : rolling
+# (or exponentially weighted) estimates of m and s, the stake per pip, the margin requirement of the book
+# (stakes are scaled down together whenever the margin would exceed the capital available) and the compound
+# return of trading the stakes, with the free cash earning r.
+#
+#   from spreadBetting import *
+#
+#   sizing = spreadStakes(prices, window=252, r=0.04, margin=500.0)
+#   sizing['stake'][-1]    # stake per pip for tomorrow, as a fraction of capital
+
+import numpy as np
+
+def _movingMoments(returns, window=None, halflife=None):
+    ''' Count, mean and variance of the returns up to and including every bar (bars x instruments) '''
+    terms = np.array([np.ones(returns.shape), returns, returns * returns])
+
+    if halflife is not None:
+        decay = 0.5 ** (1.0 / halflife)
+        sums = np.empty(terms.shape)
+        running = np.zeros(terms.shape[:1] + terms.shape[2:])
+        for t in range(terms.shape[1]):
+            running = decay * running + terms[:, t]
+            sums[:, t] = running
+    else:
+        sums = np.cumsum(terms, axis=1)
+        if window is not None:
+            sums[:, window:] = sums[:, window:] - sums[:, :-window]
+
+    n, S1, S2 = sums
+    mean = S1 / n
+    return n, mean, np.maximum(S2 / n - mean * mean, 0)
+
+def spreadStakes(prices, window=None, halflife=None, min_periods=20, r=0.0, period=252.0, kelly=1.0, \
+        margin=None, max_margin=1.0):
+    ''' Kelly stake per pip of every instrument at every bar, and the compound return of trading them.
+
+    prices      : (bars,) or (bars x instruments) prices in pips
+    window      : estimate m and s over a rolling window of bars (default expanding)
+    halflife    : estimate m and s with exponential weights of this halflife in bars instead
+    min_periods : no stake until this many returns have been seen
+    kelly       : fraction of kelly to trade
+    margin      : margin per unit of stake, in pips, per instrument (None for no margin requirement)
+    max_margin  : the stakes are scaled down together whenever margin * |stake| summed over the book would
+                  exceed this fraction of capital
+
+    The stake at bar n only uses returns up to bar n, and is held from bar n to n+1. Returns a dict of the stakes
+    (bars x instruments, fractions of capital per pip), the margin used (bars), the book returns (bars-1) and
+    the compound return (bars). '''
+
+    P = np.asarray(prices, dtype=np.float64)
+    single = P.ndim == 1
+    if single:
+        P = P[:, np.newaxis]
+
+    returns = np.diff(P, axis=0) / P[:-1]
+    n, mean, var = _movingMoments(returns, window, halflife)
+
+    m = mean * period
+    s2 = var * period
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f = kelly * (m - r) / (P[1:] * s2)
+
+    stake = np.zeros(P.shape)
+    stake[1:] = np.where((n >= min_periods) & (s2 > 0), f, 0.0)
+
+    # Margin requirement of the book, scaling all stakes down together when it exceeds max_margin
+    used = np.zeros(len(P))
+    if margin is not None:
+        used = np.abs(stake).dot(np.ones(P.shape[1]) * margin)
+        scale = np.where(used > max_margin, max_margin / np.where(used > 0, used, 1.0), 1.0)
+        stake = stake * scale[:, np.newaxis]
+        used = used * scale
+
+    # Pip gains of the book plus interest on the free cash
+    rf = (1 + r) ** (1.0 / period) - 1
+    book = np.sum(stake[:-1] * np.diff(P, axis=0), axis=1) + (1.0 - used[:-1]) * rf
+    compound_return = np.cumprod(np.insert(1 + book, 0, 1))
+
+    if single:
+        stake = stake[:, 0]
+    return {'stake': stake, 'margin': used, 'returns': book, 'compound_return': compound_return}
@@ -0,0 +1,61 @@
+# Batch fitting of stable distributions
+#
+# Fits a set of constrained stable models to many return series, distributing the (series, model) fits
+# across a process pool. The result is a table (record array) with one row per fit.
+#
+# As the fits run in worker processes, scripts calling fitAll must run their body under
+# if __name__ == '__main__' (the workers re-import the main module on Windows).
+#
+#   from stableFit import *
+#
+#   fits = fitAll({'^GSPC': log_returns})
+#   params = dict((f.model, (f.alpha, f.beta, f.gamma, f.delta)) for f in fits)
+
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import stable as stable
+
+MODELS = [ \
+    ('Normal', {'alpha': 2.0, 'beta': 0.0}), \
+    ('Cauchy', {'alpha': 1.0, 'beta': 0.0}), \
+    ('Levy', {'alpha': 0.5, 'beta': 0.0}), \
+    ('Stable', {}) \
+    ]
+
+def _fit(job):
+    symbol, returns, model, constraints, init = job
+    
+    # Module state set up by stable.init lives in the worker process, so it is set up there for each series
+    if init:
+        stable.init(returns)
+    
+    start = time.time()
+    alpha, beta, gamma, delta = stable.fit(returns, **constraints)
+    elapsed = time.time() - start
+    
+    log_likelihood = np.sum(np.log(stable.pdf((returns - delta) / gamma, alpha, beta))) - len(returns) * np.log(gamma)
+    
+    return (symbol, model, alpha, beta, gamma, delta, log_likelihood, elapsed)
+
+def fitAll(series, models=MODELS, processes=None, chunksize=None, init=False):
+    ''' Fit every model to every series. series is a dict of {symbol : returns} or a 2-D array (one series per row).
+    init calls stable.init(returns) in the worker before each fit, as a script calling stable.init before
+    stable.fit does in a single process.
+    
+    Returns a record array with fields symbol, model, alpha, beta, gamma, delta, loglik and time. '''
+    
+    if not isinstance(series, dict):
+        series = dict((str(i), row) for i, row in enumerate(np.atleast_2d(series)))
+    
+    jobs = [(symbol, np.asarray(returns, dtype=np.float64), model, constraints, init) \
+        for symbol, returns in series.items() for model, constraints in models]
+    
+    if chunksize is None:
+        chunksize = int(np.maximum(1, len(jobs) // (4 * (processes or os.cpu_count() or 1))))
+    
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_fit, jobs, chunksize=chunksize))
+    
+    return np.rec.fromrecords(results, names='symbol,model,alpha,beta,gamma,delta,loglik,time')
@@ -0,0 +1,110 @@
+# Tabulated stable distributions
+#
+# stable.pdf and stable.cdf integrate numerically for every point. Instead, the standardised pdf and cdf are
+# tabulated on a grid of alpha, beta and x and stored on disk as one memory-mapped array. Values for any alpha,
+# beta and array of x are then interpolated (bilinear in alpha/beta, linear in x).
+#
+# The table is built once, every grid node at a time across a process pool, into a temporary file that is then
+# renamed over the table, so a reader only ever sees a complete table and opens it read-only. Build it with
+#
+#   python stableTable.py [path]
+#
+# Until it is built, StableTable falls back to integrating every point with stable.pdf and stable.cdf :
+#
+#   from stableTable import *
+#
+#   table = StableTable()
+#   pdf = table.pdf(x_standard, alpha, beta)
+#   cdf = table.cdf(x_standard, alpha, beta)
+
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from stockUtils import STOCK_ROOT
+import stable as stable
+
+TABLE_ALPHA = np.around(np.linspace(0.1, 2.0, 39), 10)
+TABLE_BETA = np.around(np.linspace(-1.0, 1.0, 21), 10)
+TABLE_X = np.linspace(-40, 40, 2001)
+TABLE_PATH = STOCK_ROOT+'/stable'
+
+def _node(job):
+    i, j = job
+    return stable.pdf(TABLE_X, TABLE_ALPHA[i], TABLE_BETA[j]), stable.cdf(TABLE_X, TABLE_ALPHA[i], TABLE_BETA[j])
+
+def buildStableTable(path=TABLE_PATH, processes=None):
+    ''' Integrate every (alpha, beta) node and atomically replace the table file.
+
+    The table is a (2, alpha, beta, x) array of the pdf and cdf, written to a file private to this process
+    and renamed into place, so concurrent builds and readers never see a partial table. '''
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    jobs = [(i, j) for i in range(len(TABLE_ALPHA)) for j in range(len(TABLE_BETA))]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        nodes = list(pool.map(_node, jobs, chunksize=8))
+
+    table = np.empty((2, len(TABLE_ALPHA), len(TABLE_BETA), len(TABLE_X)))
+    for (i, j), (pdf, cdf) in zip(jobs, nodes):
+        table[0, i, j] = pdf
+        table[1, i, j] = cdf
+
+    filename = os.path.join(path, 'table.npy')
+    tmp = os.path.join(path, 'table.%d.tmp.npy' % os.getpid())
+    np.save(tmp, table)
+    os.replace(tmp, filename)
+    return filename
+
+class StableTable:
+    def __init__(self, path=TABLE_PATH):
+
+        filename = os.path.join(path, 'table.npy')
+        if not os.path.exists(filename):
+            print ("%s not built (python stableTable.py), using stable.pdf and stable.cdf" % filename)
+            self.tables = None
+            return
+
+        table = np.load(filename, mmap_mode='r')
+        if table.shape != (2, len(TABLE_ALPHA), len(TABLE_BETA), len(TABLE_X)):
+            raise ValueError("%s was built on a different grid, rebuild it with python stableTable.py" % filename)
+        self.tables = {'pdf': table[0], 'cdf': table[1]}
+
+    def _interpolate(self, name, x, alpha, beta):
+
+        # Bilinear weights of the four surrounding (alpha, beta) nodes, snapped so that fits on a node use only that node
+        i = np.clip(np.searchsorted(TABLE_ALPHA, alpha) - 1, 0, len(TABLE_ALPHA) - 2)
+        j = np.clip(np.searchsorted(TABLE_BETA, beta) - 1, 0, len(TABLE_BETA) - 2)
+        wa = np.around(np.clip((alpha - TABLE_ALPHA[i]) / (TABLE_ALPHA[i+1] - TABLE_ALPHA[i]), 0, 1), 9)
+        wb = np.around(np.clip((beta - TABLE_BETA[j]) / (TABLE_BETA[j+1] - TABLE_BETA[j]), 0, 1), 9)
+
+        # Linear weights along the uniform x grid
+        x = np.asarray(x, dtype=np.float64)
+        position = (x - TABLE_X[0]) / (TABLE_X[1] - TABLE_X[0])
+        k = np.clip(np.floor(position).astype(int), 0, len(TABLE_X) - 2)
+        f = np.clip(position - k, 0, 1)
+
+        result = np.zeros(x.shape)
+        for a, b, w in [(i, j, (1-wa)*(1-wb)), (i+1, j, wa*(1-wb)), (i, j+1, (1-wa)*wb), (i+1, j+1, wa*wb)]:
+            if w > 0:
+                values = self.tables[name][a, b]
+                result += w * (values[k] * (1 - f) + values[k+1] * f)
+        return result
+
+    def pdf(self, x, alpha, beta):
+        ''' Standardised stable pdf, zero outside the tabulated range '''
+        x = np.asarray(x, dtype=np.float64)
+        if self.tables is None:
+            return stable.pdf(x, alpha, beta)
+        return np.where((x < TABLE_X[0]) | (x > TABLE_X[-1]), 0.0, self._interpolate('pdf', x, alpha, beta))
+
+    def cdf(self, x, alpha, beta):
+        ''' Standardised stable cdf, 0 / 1 below / above the tabulated range '''
+        x = np.asarray(x, dtype=np.float64)
+        if self.tables is None:
+            return stable.cdf(x, alpha, beta)
+        return np.where(x < TABLE_X[0], 0.0, np.where(x > TABLE_X[-1], 1.0, self._interpolate('cdf', x, alpha, beta)))
+
+if __name__ == '__main__':
+    print("Built %s" % buildStableTable(*sys.argv[1:2]))
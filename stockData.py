@@ -0,0 +1,413 @@
+# Columnar cache for the stock CSV files
+#
+# Every study re-parses the same text files under STOCK_ROOT and then filters a date window out of
+# them. This module parses each CSV file once into a set of contiguous binary columns (Date as
+# datetime64[D], prices as float64, Volume as int64) which are stored next to the source file and
+# re-opened with a memory map. A reload is then a zero-parse mmap plus a binary search on the date column.
+#
+# The cache for a file is keyed by its absolute path and modification time, so editing or replacing
+# the CSV file transparently rebuilds it.
+#
+# loadStockData, loadStocks and loadPair are drop-in replacements for the stockUtils loaders, i.e.
+#
+#   from stockUtils import *
+#   from stockData import *
+#
+# Dates are passed as "mm/dd/yyyy" strings (as in the studies), datetime objects or datetime64 values,
+# and the window is inclusive at both ends.
+#
+# loadAligned loads any number of files onto one common calendar as a single (dates x files) array, ready
+# for covariance, portfolio and cointegration studies.
+#
+# For long histories of many symbols the CSV files can be ingested once into a partitioned store : one
+# directory per symbol, one partition per calendar year, one binary column file per partition. A query only
+# opens the partitions overlapping its date window, only the requested columns, and reads the rows of the
+# boundary partitions through a memory map, so a 2 year window on a 60 year history touches about 3% of the
+# data :
+#
+#   ingestCSV(glob.glob(STOCK_ROOT+'/2012/*.csv'), STOCK_ROOT+'/store')
+#   M = loadStoreData('^GSPC', "02/01/1995", "12/28/2007", columns=['Close'], store=STOCK_ROOT+'/store')
+#
+# loadStoreData also accepts the CSV file name in place of the symbol, as loadStockData.
+#
+# New daily bars are appended to the store rather than re-ingesting the history : appendData / appendCSV
+# check that the new dates are strictly increasing and after the stored history, rewrite only the partition
+# of the current year and bump the version of the symbol. A downstream cache remembers the version it was
+# built from and asks only for the rows appended since :
+#
+#   results = appendCSV(glob.glob(STOCK_ROOT+'/daily/*.csv'), STOCK_ROOT+'/store')
+#   failed = dict((symbol, e) for symbol, e in results.items() if isinstance(e, Exception))
+#
+#   version, rows = loadStoreChanges('^GSPC', version, store=STOCK_ROOT+'/store')
+#   if rows is None:    # history replaced since, rebuild in full
+#       ...
+#   else:
+#       R.extend(rows['Close'])
+
+import os
+import json
+import shutil
+import datetime as dt
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_DIR = '.cache'
+STORE_ROOT = 'store'
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d-%b-%y', '%Y%m%d']
+
+# ======================
+# Date handling
+# ======================
+
+def toDate(value):
+    ''' Convert a "mm/dd/yyyy" string, datetime or datetime64 to a datetime64[D] value '''
+    if isinstance(value, str):
+        return np.datetime64(dt.datetime.strptime(value, '%m/%d/%Y').date(), 'D')
+    return np.datetime64(value, 'D')
+
+def _parseDates(text):
+    for fmt in DATE_FORMATS:
+        try:
+            return np.array([dt.datetime.strptime(s, fmt).date() for s in text], dtype='datetime64[D]')
+        except ValueError:
+            continue
+    raise ValueError("Unrecognised date format : %s" % text[0])
+
+# ======================
+# Cache build / open
+# ======================
+
+def _cachePath(filename):
+    filename = os.path.abspath(filename)
+    return os.path.join(os.path.dirname(filename), CACHE_DIR, os.path.basename(filename))
+
+def _parseCSV(filename):
+    ''' Parse a CSV file with a header row into a dict of column arrays, sorted by date '''
+    with open(filename) as f:
+        header = [h.strip() for h in f.readline().split(',')]
+        rows = [line.strip().split(',') for line in f if line.strip()]
+
+    columns = list(zip(*rows))
+    data = {}
+    for i, name in enumerate(header):
+        if name == 'Date':
+            data[name] = _parseDates(columns[i])
+        elif name == 'Volume':
+            data[name] = np.array(columns[i], dtype=np.float64).astype(np.int64)
+        else:
+            data[name] = np.array(columns[i], dtype=np.float64)
+
+    # Yahoo files are stored newest first, the binary search needs ascending dates
+    order = np.argsort(data['Date'], kind='mergesort')
+    for name in data:
+        data[name] = np.ascontiguousarray(data[name][order])
+
+    return data
+
+def _saveColumn(filename, column):
+    ''' np.save through a temporary file, so that a reader (which may have the file memory mapped) never sees a
+    partially written file '''
+    tmp = '%s.%d.tmp.npy' % (filename[:-len('.npy')], os.getpid())
+    np.save(tmp, column)
+    os.replace(tmp, filename)
+
+def _writeMeta(path, meta):
+    tmp = os.path.join(path, 'meta.json.%d.tmp' % os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+def _buildCache(filename, path, key):
+    data = _parseCSV(filename)
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    for name, column in data.items():
+        _saveColumn(os.path.join(path, name + '.npy'), column)
+
+    # The meta file is written last, its presence marks a complete cache
+    meta = dict(key, columns=list(data.keys()))
+    _writeMeta(path, meta)
+    return meta
+
+def openCache(filename):
+    ''' Return a dict of read-only memory-mapped columns for a CSV file, building the cache if stale '''
+    stat = os.stat(filename)
+    key = {'source': os.path.abspath(filename), 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    path = _cachePath(filename)
+
+    meta = None
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except (IOError, ValueError):
+        pass
+
+    if meta is None or any(meta.get(k) != v for k, v in key.items()):
+        meta = _buildCache(filename, path, key)
+
+    return dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r')) for name in meta['columns'])
+
+# ======================
+# Loaders
+# ======================
+
+def loadStockData(filename, start, end):
+    ''' Load all columns of a stock file between the start and end dates (inclusive) '''
+    data = openCache(filename)
+    dates = data['Date']
+
+    lo = np.searchsorted(dates, toDate(start), side='left')
+    hi = np.searchsorted(dates, toDate(end), side='right')
+
+    return dict((name, column[lo:hi]) for name, column in data.items())
+
+def loadStocks(filenames, start, end):
+    ''' Load a list of stock files, returns a list of column dicts '''
+    return [loadStockData(filename, start, end) for filename in filenames]
+
+def loadAligned(filenames, start, end, column='Close', fill='drop'):
+    ''' Load one column of many stock files onto a common calendar.
+
+    The dates of all files are merged into one sorted calendar (on their integer day keys) and each file is
+    placed into it with a binary search, giving one contiguous (dates x files) array. fill decides what
+    happens to dates missing from some of the files : 'drop' keeps only the dates common to all files,
+    'ffill' carries the last known value forward and 'nan' leaves the gaps as NaN.
+
+    Returns a dict with the calendar ('Date') and the (dates x files) array ('data'). '''
+
+    data = loadStocks(filenames, start, end)
+    keys = [M['Date'].astype(np.int64) for M in data]
+    calendar = np.unique(np.concatenate(keys))
+
+    values = np.full((len(calendar), len(data)), np.nan)
+    for i, M in enumerate(data):
+        values[np.searchsorted(calendar, keys[i]), i] = M[column]
+
+    missing = np.isnan(values)
+    if fill == 'drop':
+        keep = ~missing.any(axis=1)
+        calendar, values = calendar[keep], values[keep]
+    elif fill == 'ffill':
+        index = np.where(missing, 0, np.arange(len(calendar))[:, np.newaxis])
+        index = np.maximum.accumulate(index, axis=0)
+        values = values[index, np.arange(len(data))]
+    elif fill != 'nan':
+        raise ValueError("Unknown fill policy : %s" % fill)
+
+    return {'Date': calendar.astype('datetime64[D]'), 'data': np.ascontiguousarray(values)}
+
+def loadPair(filename1, filename2, start, end):
+    ''' Load the closing prices of two stock files on their common dates '''
+    result = loadAligned([filename1, filename2], start, end)
+    return {'data1': result['data'][:, 0], 'data2': result['data'][:, 1], 'date': result['Date']}
+
+# ======================
+# Partitioned store
+# ======================
+
+def symbolOf(name):
+    ''' Symbol of a stock file name (e.g. STOCK_ROOT+'/2012/^GSPC.csv' -> '^GSPC'), or the symbol itself '''
+    base = os.path.basename(name)
+    return base[:-4] if base.lower().endswith('.csv') else base
+
+def readMeta(symbol, store=STORE_ROOT):
+    ''' The partition index of a symbol : its columns, their dtypes and the (year, first day, last day, rows)
+    of every partition, days being integer datetime64[D] values '''
+    with open(os.path.join(store, symbolOf(symbol), 'meta.json')) as f:
+        return json.load(f)
+
+def _writePartitions(path, data):
+    ''' Write sorted column data into one directory per calendar year, returns the partition index '''
+    days = data['Date'].astype(np.int64)
+    years = data['Date'].astype('datetime64[Y]').astype(np.int64) + 1970
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(years)) + 1, [len(years)]))
+
+    partitions = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if lo == hi:
+            continue
+        year = int(years[lo])
+        folder = os.path.join(path, str(year))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        for name, column in data.items():
+            np.save(os.path.join(folder, name + '.npy'), np.ascontiguousarray(column[lo:hi]))
+        partitions.append([year, int(days[lo]), int(days[hi - 1]), int(hi - lo)])
+    return partitions
+
+def _recover(path):
+    ''' Move back a history left aside (path.old) by a swap interrupted before the new history was moved in '''
+    if not os.path.isdir(path) and os.path.isdir(path + '.old'):
+        os.rename(path + '.old', path)
+
+def storeData(symbol, data, store=STORE_ROOT):
+    ''' Replace the stored history of a symbol by a dict of columns (with a 'Date' column) '''
+    path = os.path.join(store, symbolOf(symbol))
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    old = path + '.old'
+    _recover(path)
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    try:
+        version = readMeta(symbol, store).get('version', 0) + 1
+    except (IOError, ValueError):
+        version = 1
+
+    order = np.argsort(data['Date'], kind='mergesort')
+    data = dict((name, np.asarray(column)[order]) for name, column in data.items())
+    meta = { \
+        'columns': list(data.keys()), \
+        'dtypes': dict((name, column.dtype.str) for name, column in data.items()), \
+        'partitions': _writePartitions(tmp, data)}
+
+    # The log of (version, rows, last day) starts again : caches built from earlier versions must rebuild
+    rows = sum(p[3] for p in meta['partitions'])
+    meta['version'] = version
+    meta['log'] = [[version, rows, meta['partitions'][-1][2] if rows else None]]
+    _writeMeta(tmp, meta)
+
+    # Swap the new history in as a whole : the current one is only deleted once it has been moved aside and
+    # replaced, so a crash at any point leaves a complete history in path or in path.old
+    if os.path.isdir(old):
+        shutil.rmtree(old)
+    if os.path.isdir(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+def _ingest(job):
+    filename, store = job
+    meta = storeData(symbolOf(filename), _parseCSV(filename), store)
+    return symbolOf(filename), sum(p[3] for p in meta['partitions'])
+
+def ingestCSV(filenames, store=STORE_ROOT, processes=None):
+    ''' Parse stock CSV files (in parallel) into the partitioned store. Returns a dict of rows per symbol. '''
+    if not os.path.isdir(store):
+        os.makedirs(store)
+    jobs = [(filename, store) for filename in filenames]
+    if processes == 1:
+        return dict(map(_ingest, jobs))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return dict(pool.map(_ingest, jobs, chunksize=16))
+
+def loadStoreData(symbol, start, end, columns=None, store=STORE_ROOT):
+    ''' Load the columns (default : all) of a stored symbol between the start and end dates (inclusive).
+
+    Only the partitions overlapping the window are opened. Their columns are memory mapped, and the rows of
+    the first and last partition are found by a binary search on their dates, so only the pages of the rows
+    in the window are read. '''
+
+    meta = readMeta(symbol, store)
+    path = os.path.join(store, symbolOf(symbol))
+    columns = meta['columns'] if columns is None else columns
+    first = toDate(start).astype(np.int64)
+    last = toDate(end).astype(np.int64)
+
+    parts = dict((name, []) for name in columns)
+    for year, lo_day, hi_day, rows in meta['partitions']:
+        if hi_day < first or lo_day > last:
+            continue
+        folder = os.path.join(path, str(year))
+        # Only the first `rows` rows are committed, an interrupted append may have written more
+        lo, hi = 0, rows
+        if lo_day < first or hi_day > last:
+            dates = np.load(os.path.join(folder, 'Date.npy'), mmap_mode='r').view(np.int64)[:rows]
+            lo = np.searchsorted(dates, first, side='left')
+            hi = np.searchsorted(dates, last, side='right')
+        for name in columns:
+            parts[name].append(np.load(os.path.join(folder, name + '.npy'), mmap_mode='r')[lo:hi])
+
+    return dict((name, np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=meta['dtypes'][name])) \
+        for name in columns)
+
+def loadStoreStocks(symbols, start, end, columns=None, store=STORE_ROOT):
+    ''' Load a list of stored symbols, returns a list of column dicts '''
+    return [loadStoreData(symbol, start, end, columns, store) for symbol in symbols]
+
+# ======================
+# Appending new bars
+# ======================
+
+def validateDates(dates, after=None):
+    ''' Raise a ValueError unless the dates are strictly increasing (no duplicates) and all after `after` '''
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    bad = np.flatnonzero(np.diff(days) <= 0)
+    if len(bad):
+        raise ValueError("Dates not strictly increasing at %s" % \
+            ', '.join(str(d) for d in days[bad[:5] + 1].astype('datetime64[D]')))
+    if after is not None and len(days) and days[0] <= after:
+        raise ValueError("Dates from %s overlap the stored history ending %s" % \
+            (days[0].astype('datetime64[D]'), np.int64(after).astype('datetime64[D]')))
+
+def appendData(symbol, data, store=STORE_ROOT):
+    ''' Append new bars (a dict of columns with a 'Date' column) to a stored symbol and bump its version.
+    A symbol not stored yet is created. Returns the version. '''
+    path = os.path.join(store, symbolOf(symbol))
+    _recover(path)
+    if not os.path.isdir(path):
+        return storeData(symbol, data, store)['version']
+
+    # An existing history whose meta file cannot be read raises rather than being replaced by the new bars
+    meta = readMeta(symbol, store)
+
+    if sorted(data.keys()) != sorted(meta['columns']):
+        raise ValueError("Columns %s do not match the stored columns %s" % (sorted(data.keys()), meta['columns']))
+    data = dict((name, np.asarray(data[name], dtype=meta['dtypes'][name])) for name in meta['columns'])
+    partitions = meta['partitions']
+    validateDates(data['Date'], partitions[-1][2] if partitions else None)
+    if len(data['Date']) == 0:
+        return meta.get('version', 0)
+
+    # New bars of the last stored year are added to its partition, the others start new partitions
+    years = data['Date'].astype('datetime64[Y]').astype(np.int64) + 1970
+    same = int(np.count_nonzero(years == partitions[-1][0])) if partitions else 0
+    if same:
+        year, lo_day, hi_day, rows = partitions[-1]
+        folder = os.path.join(path, str(year))
+        for name in meta['columns']:
+            old = np.load(os.path.join(folder, name + '.npy'), mmap_mode='r')[:rows]
+            _saveColumn(os.path.join(folder, name + '.npy'), np.concatenate((old, data[name][:same])))
+        partitions[-1] = [year, lo_day, int(data['Date'][same - 1].astype(np.int64)), rows + same]
+    partitions.extend(_writePartitions(path, dict((name, column[same:]) for name, column in data.items())))
+
+    # The meta file commits the append
+    meta['version'] = meta.get('version', 0) + 1
+    meta['log'] = meta.get('log', []) + [[meta['version'], sum(p[3] for p in partitions), partitions[-1][2]]]
+    _writeMeta(path, meta)
+    return meta['version']
+
+def _append(job):
+    # A bad file fails its own symbol only, not the rest of the batch
+    filename, store = job
+    try:
+        return symbolOf(filename), appendData(symbolOf(filename), _parseCSV(filename), store)
+    except Exception as e:
+        return symbolOf(filename), e
+
+def appendCSV(filenames, store=STORE_ROOT, processes=None):
+    ''' Append the bars of CSV files of new data (one per symbol, named as the symbol) to the store, in
+    parallel. Returns a dict of the new version per symbol, or of the exception raised for a symbol whose
+    bars could not be appended (that symbol is left as it was). '''
+    jobs = [(filename, store) for filename in filenames]
+    if processes == 1:
+        return dict(map(_append, jobs))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return dict(pool.map(_append, jobs, chunksize=64))
+
+def loadStoreChanges(symbol, version, columns=None, store=STORE_ROOT):
+    ''' The bars appended to a stored symbol since `version` (0 : nothing loaded yet).
+
+    Returns the current version and a column dict of the new bars, or None in place of the bars when the
+    history was replaced (or never loaded) since that version, in which case it must be loaded in full. '''
+    meta = readMeta(symbol, store)
+    days = dict((v, day) for v, rows, day in meta.get('log', []))
+    if version not in days or not meta['partitions']:
+        return meta.get('version', 0), None
+    start = np.datetime64(meta['partitions'][0][1] if days[version] is None else days[version] + 1, 'D')
+    end = np.datetime64(meta['partitions'][-1][2], 'D')
+    return meta['version'], loadStoreData(symbol, start, end, columns, store)
@@ -0,0 +1,152 @@
+# Return transforms of price series
+#
+# The studies derive several representations of the returns of the same prices (net, gross and log returns per
+# bar, compound, cumulative log and percent returns since the first bar) and each of them re-computes the price
+# ratio p[1:] / p[:-1] (or p / p[0]) into a fresh array. Here every transform is written as a chain of in place
+# ufunc calls into a single output array, which can also be passed in with out= to re-use a buffer.
+#
+# Prices can be one series (bars,) or many aligned series (bars x symbols), time runs along the first axis.
+# Per bar returns have one bar less than the prices, or the same number with pad=True (the first bar is then
+# the neutral return : 1 for gross, 0 for net and log returns), so that they line up with the dates.
+#
+# Returns wraps a price array and computes each representation the first time it is used, sharing the price
+# ratios between them :
+#
+#   from stockReturns import *
+#
+#   R = Returns(close_prices, pad=True)
+#   R.log, R.net, R.compound
+#   R.extend(new_close_prices)        # new bars only extend the representations already computed
+
+import numpy as np
+
+# ======================
+# Kernels
+# ======================
+
+def _buffer(prices, pad, out):
+    ''' Output array for per bar returns, and the part of it holding the bars after the first '''
+    shape = (len(prices) if pad else len(prices) - 1,) + prices.shape[1:]
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape:
+        raise ValueError("out has shape %s, expected %s" % (out.shape, shape))
+    return out, (out[1:] if pad else out)
+
+def grossReturn(prices, pad=False, out=None):
+    ''' Gross returns p[n] / p[n-1] '''
+    prices = np.asarray(prices, dtype=np.float64)
+    out, body = _buffer(prices, pad, out)
+    np.divide(prices[1:], prices[:-1], out=body)
+    if pad:
+        out[0] = 1.0
+    return out
+
+def netReturn(prices, pad=False, out=None):
+    ''' Net returns p[n] / p[n-1] - 1 '''
+    prices = np.asarray(prices, dtype=np.float64)
+    out, body = _buffer(prices, pad, out)
+    np.divide(prices[1:], prices[:-1], out=body)
+    np.subtract(body, 1.0, out=body)
+    if pad:
+        out[0] = 0.0
+    return out
+
+def logReturn(prices, pad=False, out=None):
+    ''' Log returns log(p[n] / p[n-1]) '''
+    prices = np.asarray(prices, dtype=np.float64)
+    out, body = _buffer(prices, pad, out)
+    np.divide(prices[1:], prices[:-1], out=body)
+    np.log(body, out=body)
+    if pad:
+        out[0] = 0.0
+    return out
+
+def compoundReturn(prices, out=None):
+    ''' Compound returns p[n] / p[0], the value of 1 invested at the first bar '''
+    prices = np.asarray(prices, dtype=np.float64)
+    return np.divide(prices, prices[0], out=out)
+
+def cumulativeLogReturn(prices, out=None):
+    ''' Cumulative log returns log(p[n] / p[0]) '''
+    out = compoundReturn(prices, out)
+    return np.log(out, out=out)
+
+def percentReturn(prices, out=None):
+    ''' Percent returns since the first bar, 100 * (p[n] / p[0] - 1) '''
+    out = compoundReturn(prices, out)
+    np.subtract(out, 1.0, out=out)
+    return np.multiply(out, 100.0, out=out)
+
+# ======================
+# Lazy representations
+# ======================
+
+class Returns:
+    ''' The returns of a price series (or of many aligned series), each representation computed once on first use.
+
+    gross, net and log are per bar returns (padded to the length of the prices with pad=True), compound,
+    cumulative (log) and percent are returns since the first bar. The per bar representations are derived from
+    the shared gross returns, and cumulative / percent from the compound returns, so no price ratio is computed
+    twice. Every representation is a cached array : copy it before modifying it. '''
+
+    def __init__(self, prices, pad=False):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.pad = pad
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def gross(self):
+        return self._get('gross', lambda: grossReturn(self.prices, self.pad))
+
+    @property
+    def net(self):
+        return self._get('net', lambda: np.subtract(self.gross, 1.0))
+
+    @property
+    def log(self):
+        return self._get('log', lambda: np.log(self.gross))
+
+    @property
+    def compound(self):
+        return self._get('compound', lambda: compoundReturn(self.prices))
+
+    @property
+    def cumulative(self):
+        return self._get('cumulative', lambda: np.log(self.compound))
+
+    @property
+    def percent(self):
+        def build():
+            out = np.subtract(self.compound, 1.0)
+            return np.multiply(out, 100.0, out=out)
+        return self._get('percent', build)
+
+    def extend(self, prices):
+        ''' Append new bars to the prices, extending the representations computed so far with the returns of the
+        new bars only (e.g. with the rows of stockData.loadStoreChanges) '''
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) == 0:
+            return self
+
+        # Per bar returns of the new bars follow on from the last known price, returns since the first bar
+        # stay relative to the first price
+        tail = Returns(np.concatenate((self.prices[-1:], prices)))
+        compound = lambda: np.divide(prices, self.prices[0])
+        build = { \
+            'gross': lambda: tail.gross, \
+            'net': lambda: tail.net, \
+            'log': lambda: tail.log, \
+            'compound': compound, \
+            'cumulative': lambda: np.log(compound()), \
+            'percent': lambda: np.multiply(np.subtract(compound(), 1.0), 100.0)}
+
+        for name in self._cache:
+            self._cache[name] = np.concatenate((self._cache[name], build[name]()))
+        self.prices = np.concatenate((self.prices, prices))
+        return self
@@ -0,0 +1,215 @@
+# Statistics of strategy returns
+#
+# Strategy computes the unleveraged statistics of a series of net returns (mean, Sharpe ratio, Kelly optimal
+# leverage), compounds the returns at a chosen fraction of the Kelly leverage, and reports the resulting APR,
+# max drawdown and RoMaD. StreamingStrategy keeps the same statistics up to date as new bars arrive, and
+# StrategyGrid evaluates the same underlying return for a whole grid of Kelly fractions and borrowing rates
+# at once : the unleveraged moments are computed once, and every statistic is a broadcast array with one
+# entry per (kelly, r) combination. Pass e.g. kelly=[[0.5],[1.0]], r=[0,0.04] for the full 2x2 grid.
+#
+#   from strategyStats import *
+#
+#   Strategy(net_return(M['Close']), name='S&P500 Half-Kelly', kelly=0.5, r=0.04).display()
+#   live = StreamingStrategy(name='S&P500 (Streamed)', r=0.04)
+#   live.update(returns_of_today)
+#   grid = StrategyGrid(net_return(M['Close']), names=['Unlevered', 'Full Kelly'], kelly=[0, 1.0], r=0.04)
+#   grid.display()
+
+import numpy as np
+from uuid import uuid4
+from drawdown import maxDD
+
+# ======================
+# Strategy Class
+# ======================
+
+class Strategy:
+    def __init__(self, net_return, name=uuid4().hex, period=252.0, kelly=0, r=0):
+        
+        ''' Unleveraged Returns & Statistics '''
+        self.name = name
+        self.net_return = net_return   
+        self.r = r    
+        self.mean = np.mean(self.net_return) 
+        self.var = np.var(self.net_return)
+        self.std = np.std(self.net_return)
+        self.amean = self.mean * period
+        self.kelly = (self.mean - (self.r / period)) / self.var
+        self.sharpe = np.sqrt(period) * (self.mean - (self.r / period)) / self.std
+        
+        ''' Leveraged Returns & Statistics '''
+        self.leverage = 1
+        if kelly>0:
+            self.leverage = kelly * self.kelly
+        
+        compound_return = np.cumprod(1 + (self.leverage * net_return + (1.0 - self.leverage) * ((1 + self.r) ** (1.0/period) - 1)))
+        self.compound_return = np.insert(compound_return,0,1)
+        
+        # Difference between gmean and APR due to daily compounded returns (APR) rather than continuously compounded returns (gmean)
+        self.gmean = np.exp(r + self.leverage * ((self.mean * period) - r) - ((self.var * period * (self.leverage ** 2)) / 2.0))-1
+        self.APR = self.compound_return[-1] ** (1.0 * period/float(len(self.compound_return))) - 1 # Nth root of the final capital
+        self.APR = np.exp(np.log(self.compound_return[-1]) / (len(self.compound_return) / period)) - 1 # exp(log of final capital / T)
+        
+        self.maxDD, self.maxDDD = maxDD(self.compound_return)
+        self.romad = self.APR / self.maxDD
+    
+    def display(self):
+        
+        # Strategy Statistics
+        print("")
+        print("=" * (len(self.name) + 14))
+        print("Strategy ID : %s " % self.name)
+        print("Aritmetic Mean = %.2f" % (self.amean * 100))
+        print("Sharpe Ratio = %.2f" % self.sharpe)
+        print("Kelly Optimal Leverage = %.2f" % self.kelly)
+        
+        # Execution Statistics
+        print("Geometric Mean Annual Return (APR) = %.2f%%" % (self.gmean * 100))
+        print("Max Drawdown = %.2f%%" % (self.maxDD * 100))
+        print("Max Drawdown Duration = %d days" % self.maxDDD)
+        print("Return over Maximum Drawdown (RoMaD) = %.2f" % self.romad)
+        print("Strategy Leverage = %.2f" % self.leverage)
+        print("APR = %.2f" % (self.APR * 100))
+        print("=" * (len(self.name) + 14))
+            
+# ======================
+# Streaming Strategy
+# ======================
+#
+# Incremental version of the Strategy statistics, for strategies that receive new bars over time. Bars are
+# fed one at a time or in chunks through update(), and each update costs O(1) per bar : the mean and variance
+# use Welford's algorithm (merged chunk-wise), and the compound value, peak and drawdown duration are carried
+# forward from the previous update.
+#
+# As the Kelly value is only known from the bars seen so far, the leverage applied to an update is the one
+# estimated before that update, and it stays at 1 until `warmup` bars (default one period) have been seen.
+# With kelly=0 (unlevered) the statistics match the Strategy class exactly.
+
+class StreamingStrategy(Strategy):
+    def __init__(self, name=uuid4().hex, period=252.0, kelly=0, r=0, warmup=None):
+        
+        self.name = name
+        self.period = period
+        self.warmup = period if warmup is None else warmup
+        self.kelly_fraction = kelly
+        self.r = r
+        self.rate = (1 + r) ** (1.0/period) - 1
+        
+        ''' Running moments '''
+        self.n = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        
+        ''' Running compound return and drawdown '''
+        self.value = 1.0
+        self.peak = 1.0
+        self.duration = 0
+        self.maxDD = 0.0
+        self.maxDDD = 0
+        
+        self.leverage = 1
+        self._statistics()
+    
+    def update(self, net_return):
+        
+        x = np.atleast_1d(np.asarray(net_return, dtype=float))
+        k = len(x)
+        if k == 0:
+            return self
+        
+        # Compound the new bars at the current leverage
+        values = self.value * np.cumprod(1 + (self.leverage * x + (1.0 - self.leverage) * self.rate))
+        peaks = np.maximum(self.peak, np.maximum.accumulate(values))
+        
+        index = np.arange(1, k + 1)
+        last_peak = np.maximum.accumulate(np.where(values >= peaks, index, 0))
+        duration = np.where(last_peak > 0, index - last_peak, self.duration + index)
+        
+        self.maxDD = np.maximum(self.maxDD, (1 - values / peaks).max())
+        self.maxDDD = np.maximum(self.maxDDD, duration.max())
+        self.value = values[-1]
+        self.peak = peaks[-1]
+        self.duration = duration[-1]
+        
+        # Merge the chunk moments into the running moments (Chan et al. parallel Welford update)
+        mean_x = x.mean()
+        M2_x = ((x - mean_x) ** 2).sum()
+        n = self.n + k
+        delta = mean_x - self.mean
+        self.mean = self.mean + delta * k / n
+        self.M2 = self.M2 + M2_x + delta * delta * self.n * k / n
+        self.n = n
+        
+        self._statistics()
+        return self
+    
+    def _statistics(self):
+        
+        period = self.period
+        self.var = self.M2 / self.n if self.n > 0 else 0.0
+        self.std = np.sqrt(self.var)
+        self.amean = self.mean * period
+        self.kelly = (self.mean - (self.r / period)) / self.var if self.var > 0 else 0.0
+        self.sharpe = np.sqrt(period) * (self.mean - (self.r / period)) / self.std if self.std > 0 else 0.0
+        
+        if self.kelly_fraction > 0 and self.n >= self.warmup:
+            self.leverage = self.kelly_fraction * self.kelly
+        
+        self.gmean = np.exp(self.r + self.leverage * ((self.mean * period) - self.r) - ((self.var * period * (self.leverage ** 2)) / 2.0))-1
+        self.APR = np.exp(np.log(self.value) / ((self.n + 1) / period)) - 1
+        self.romad = self.APR / self.maxDD if self.maxDD > 0 else 0.0
+
+# ======================
+# Strategy Grid
+# ======================
+
+class StrategyGrid:
+    def __init__(self, net_return, names=None, period=252.0, kelly=0, r=0):
+        
+        ''' Unleveraged Returns & Statistics (shared by the whole grid) '''
+        self.net_return = net_return
+        self.mean = np.mean(self.net_return)
+        self.var = np.var(self.net_return)
+        self.std = np.std(self.net_return)
+        self.amean = self.mean * period
+        
+        self.kelly_fraction, self.r = np.broadcast_arrays(np.asarray(kelly, dtype=float), np.asarray(r, dtype=float))
+        self.names = names
+        self.kelly = (self.mean - (self.r / period)) / self.var
+        self.sharpe = np.sqrt(period) * (self.mean - (self.r / period)) / self.std
+        
+        ''' Leveraged Returns & Statistics, one row per grid point '''
+        self.leverage = np.where(self.kelly_fraction > 0, self.kelly_fraction * self.kelly, 1.0)
+        
+        leverage = self.leverage[..., np.newaxis]
+        rate = ((1 + self.r) ** (1.0/period) - 1)[..., np.newaxis]
+        compound_return = np.cumprod(1 + (leverage * net_return + (1.0 - leverage) * rate), axis=-1)
+        self.compound_return = np.concatenate((np.ones(compound_return.shape[:-1] + (1,)), compound_return), axis=-1)
+        
+        self.gmean = np.exp(self.r + self.leverage * ((self.mean * period) - self.r) - ((self.var * period * (self.leverage ** 2)) / 2.0))-1
+        self.APR = np.exp(np.log(self.compound_return[..., -1]) / (self.compound_return.shape[-1] / period)) - 1
+        
+        self.maxDD, self.maxDDD = maxDD(self.compound_return)
+        self.romad = self.APR / self.maxDD
+    
+    def display(self):
+        
+        for i in np.ndindex(self.leverage.shape):
+            name = self.names[i[0]] if self.names is not None and len(i) == 1 else str(i)
+            
+            # Strategy Statistics
+            print("")
+            print("=" * (len(name) + 14))
+            print("Strategy ID : %s " % name)
+            print("Aritmetic Mean = %.2f" % (self.amean * 100))
+            print("Sharpe Ratio = %.2f" % self.sharpe[i])
+            print("Kelly Optimal Leverage = %.2f" % self.kelly[i])
+            
+            # Execution Statistics
+            print("Geometric Mean Annual Return (APR) = %.2f%%" % (self.gmean[i] * 100))
+            print("Max Drawdown = %.2f%%" % (self.maxDD[i] * 100))
+            print("Max Drawdown Duration = %d days" % self.maxDDD[i])
+            print("Return over Maximum Drawdown (RoMaD) = %.2f" % self.romad[i])
+            print("Strategy Leverage = %.2f" % self.leverage[i])
+            print("APR = %.2f" % (self.APR[i] * 100))
+            print("=" * (len(name) + 14))
@@ -0,0 +1,109 @@
+# Tail exponents of return distributions
+#
+# The tails of a heavy tailed distribution decay as a power law, P(|X - delta| > x) ~ x^-alpha, so the tail
+# exponent alpha is the slope of the log survival probability against the log magnitude. tailIndex measures
+# it for the left and right tails of one or many return series at several tail sizes at once, with the Hill
+# estimator or a least squares slope, and tailRegression fits many log-log lines in one batch. sketchTailIndex
+# does the same from the exact tail buffers of a returnSketch.QuantileSketch, without the full series.
+#
+#   from tails import *
+#
+#   left_alpha, left_se, right_alpha, right_se = tailIndex(log_returns, fractions=[0.01, 0.05, 0.1])
+#   left_alpha, left_se, right_alpha, right_se = sketchTailIndex(summary.quantiles, delta, fractions)
+
+import numpy as np
+
+def getLeftTail(x, delta):
+    ''' Number of sorted values in the left tail (x <= delta). For a 2-D x, one sorted series and delta per row. '''
+    x = np.asarray(x)
+    if x.ndim == 1:
+        return np.searchsorted(x, delta, side='right')
+    return np.sum(x <= np.asarray(delta)[..., np.newaxis], axis=-1)
+    
+def getRightTail(x, delta):
+    ''' Index of the first sorted value in the right tail (x >= delta). For a 2-D x, one sorted series and delta per row. '''
+    x = np.asarray(x)
+    if x.ndim == 1:
+        return np.searchsorted(x, delta, side='left')
+    return np.sum(x < np.asarray(delta)[..., np.newaxis], axis=-1)
+
+def tailRegression(x, y):
+    ''' Least squares fit of y = slope * x + intercept along the last axis, for many lines at once.
+    Returns the slopes, intercepts and standard errors of the slopes. '''
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    n = x.shape[-1]
+    
+    xr = x - x.mean(axis=-1, keepdims=True)
+    yr = y - y.mean(axis=-1, keepdims=True)
+    sxx = np.sum(xr * xr, axis=-1)
+    slope = np.sum(xr * yr, axis=-1) / sxx
+    intercept = y.mean(axis=-1) - slope * x.mean(axis=-1)
+    
+    residual = yr - slope[..., np.newaxis] * xr
+    se = np.sqrt(np.sum(residual * residual, axis=-1) / (n - 2) / sxx)
+    
+    return slope, intercept, se
+
+def _tailEstimate(y, n, k, method):
+    ''' Tail exponent and standard error from the tail magnitudes y (sorted descending, one series per row)
+    for every tail size in k. n is the full sample size. '''
+    
+    logy = np.log(np.where(y > 0, y, np.nan))
+    
+    if method == 'hill':
+        # alpha = 1 / (mean of the k largest log magnitudes - log of the (k+1)th)
+        mean_log = np.cumsum(logy, axis=-1)[:, k - 1] / k
+        alpha = 1.0 / (mean_log - logy[:, k])
+        return alpha, alpha / np.sqrt(k)
+    
+    # Least squares slope of log survival probability i/(n+1) against log magnitude, for the k largest
+    logp = np.log(np.arange(1, y.shape[-1] + 1) / (n + 1.0))
+    Sx = np.cumsum(logy, axis=-1)[:, k - 1]
+    Sy = np.cumsum(logp)[k - 1]
+    Sxx = np.cumsum(logy * logy, axis=-1)[:, k - 1]
+    Sxy = np.cumsum(logy * logp, axis=-1)[:, k - 1]
+    Syy = np.cumsum(logp * logp)[k - 1]
+    
+    vxx = Sxx - Sx * Sx / k
+    slope = (Sxy - Sx * Sy / k) / vxx
+    sse = (Syy - Sy * Sy / k) - slope * slope * vxx
+    return -slope, np.sqrt(np.maximum(sse, 0) / (k - 2) / vxx)
+
+def tailIndex(returns, delta=None, fractions=[0.05], method='hill'):
+    ''' Left and right tail exponents of one or many return series (one per row), for each tail fraction.
+    
+    The tails are measured from delta (default : the median). method is 'hill' for the Hill estimator or
+    'lstsq' for the least squares slope of the log empirical cdf. Returns left alpha, left standard error,
+    right alpha and right standard error, each of shape (series, fractions), or (fractions,) for one series. '''
+    
+    r = np.atleast_2d(np.asarray(returns, dtype=float))
+    n = r.shape[-1]
+    delta = np.median(r, axis=-1) if delta is None else np.asarray(delta, dtype=float) * np.ones(r.shape[0])
+    d = r - delta[:, np.newaxis]
+    
+    # Tail magnitudes sorted largest first, zero for values in the other tail
+    left = -np.sort(np.where(d < 0, d, 0), axis=-1)
+    right = np.sort(np.where(d > 0, d, 0), axis=-1)[:, ::-1]
+    
+    k = np.clip((np.asarray(fractions, dtype=float) * n).astype(int), 3, n - 1)
+    left_alpha, left_se = _tailEstimate(left, n, k, method)
+    right_alpha, right_se = _tailEstimate(right, n, k, method)
+    
+    if np.asarray(returns).ndim == 1:
+        return left_alpha[0], left_se[0], right_alpha[0], right_se[0]
+    return left_alpha, left_se, right_alpha, right_se
+
+def sketchTailIndex(sketch, delta=None, fractions=[0.05], method='hill'):
+    ''' tailIndex of one series from the exact tails kept by a QuantileSketch, without the full series.
+    The tail sizes are limited to the tail buffer of the sketch. '''
+    
+    n = sketch.n
+    delta = sketch.quantile(0.5) if delta is None else delta
+    low, high = sketch.tails()
+    left = -np.minimum(low - delta, 0)[np.newaxis]
+    right = np.maximum(high - delta, 0)[np.newaxis]
+    
+    k = np.clip((np.asarray(fractions, dtype=float) * n).astype(int), 3, np.minimum(len(low), len(high)) - 1)
+    left_alpha, left_se = _tailEstimate(left, n, k, method)
+    right_alpha, right_se = _tailEstimate(right, n, k, method)
+    return left_alpha[0], left_se[0], right_alpha[0], right_se[0]